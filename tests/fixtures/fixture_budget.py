@@ -0,0 +1,15 @@
+import pytest
+from django.urls import reverse
+
+
+@pytest.fixture
+def query_budget():
+    """Запрос страницы с проверкой бюджета SQL из settings.QUERY_BUDGETS."""
+    from core.instrumentation import check_budget, collect_metrics
+
+    def get(client, url_name, budget=None, **kwargs):
+        with collect_metrics() as metrics:
+            response = client.get(reverse(url_name, kwargs=kwargs))
+        check_budget(url_name, metrics, budget)
+        return response
+    return get
@@ -0,0 +1,36 @@
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestQueryBudget:
+
+    def test_index_budget(self, user_client, query_budget, few_posts_with_group):
+        response = query_budget(user_client, 'posts:index')
+        assert response.status_code == 200
+
+    def test_group_budget(self, user_client, query_budget, few_posts_with_group):
+        response = query_budget(
+            user_client, 'posts:group_list', slug=few_posts_with_group.group.slug
+        )
+        assert response.status_code == 200
+
+    def test_profile_budget(self, user_client, query_budget, few_posts_with_group):
+        response = query_budget(
+            user_client, 'posts:profile', username=few_posts_with_group.author.username
+        )
+        assert response.status_code == 200
+
+    def test_post_detail_budget(self, user_client, query_budget, post_with_group):
+        response = query_budget(
+            user_client, 'posts:post_detail', post_id=post_with_group.id
+        )
+        assert response.status_code == 200
+
+    def test_follow_budget(self, user_client, query_budget, few_posts_with_group):
+        response = query_budget(user_client, 'posts:follow_index')
+        assert response.status_code == 200
+
+    def test_budget_exceeded(self, user_client, query_budget, post):
+        with pytest.raises(AssertionError):
+            query_budget(user_client, 'posts:index', budget=0)
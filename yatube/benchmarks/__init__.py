@@ -0,0 +1,25 @@
+"""Нагрузочные замеры yatube.
+
+Запуск из каталога yatube:
+
+    python -m benchmarks seed
+    python -m benchmarks run --requests 200 --save benchmarks/baseline.json
+    python -m benchmarks run --baseline benchmarks/baseline.json
+    python -m benchmarks concurrency --clients 50 --client-delay 0.05
+    python -m benchmarks contention --readers 8 --writers 2
+
+seed наполняет отдельную базу (YATUBE_DB, по умолчанию
+benchmark.sqlite3) синтетическими пользователями, группами, постами,
+комментариями и подписками: по умолчанию 10 000 пользователей, 1 000 000
+постов, 200 000 комментариев и 50 000 подписок. Вместе с пересчетом
+счетчиков, лент, каталога групп и поискового индекса это около пяти
+минут на одном ядре; с --skip-derived — меньше минуты, но счетчики,
+ленты подписок и поисковый индекс остаются непересчитанными.
+run обходит все маршруты posts.urls, users.urls и about.urls через
+WSGI-приложение в том же процессе и печатает p50/p95/p99, пропускную
+способность и число SQL-запросов.
+concurrency сравнивает синхронные WSGI-воркеры и yatube.asgi под
+множеством одновременных, в том числе медленных, клиентов.
+contention одновременно читает ленты и пишет комментарии и сравнивает
+SQLite по умолчанию с SQLITE_PRAGMAS и CONN_MAX_AGE.
+"""
@@ -0,0 +1,135 @@
+import argparse
+import os
+import platform
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Наполнение базы и замеры маршрутов yatube.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser(
+        'seed', help='Наполнить базу синтетическими данными.')
+    seed_parser.add_argument('--users', type=int, default=10000)
+    seed_parser.add_argument('--groups', type=int, default=50)
+    seed_parser.add_argument('--posts', type=int, default=1000000)
+    seed_parser.add_argument('--comments', type=int, default=200000)
+    seed_parser.add_argument('--follows', type=int, default=50000)
+    seed_parser.add_argument('--batch-size', type=int, default=5000)
+    seed_parser.add_argument('--processes', type=int, default=1)
+    seed_parser.add_argument('--seed', type=int, default=0)
+    seed_parser.add_argument(
+        '--skip-derived', action='store_true',
+        help='Не пересчитывать счетчики, ленты, группы и поиск.')
+
+    run_parser = commands.add_parser('run', help='Замерить маршруты.')
+    run_parser.add_argument('--requests', type=int, default=100)
+    run_parser.add_argument('--warmup', type=int, default=5)
+    run_parser.add_argument(
+        '--anonymous', action='store_true',
+        help='Замерять без входа на сайт.')
+    run_parser.add_argument(
+        '--only', action='append',
+        help='Замерять только маршруты, в имени которых есть подстрока.')
+    run_parser.add_argument(
+        '--baseline', help='JSON с прошлыми результатами для сравнения.')
+    run_parser.add_argument(
+        '--save', help='Куда сохранить результаты как новую базовую линию.')
+
+    concurrency_parser = commands.add_parser(
+        'concurrency',
+        help='Сравнить WSGI и ASGI под одновременной нагрузкой.')
+    concurrency_parser.add_argument('--url', default='/')
+    concurrency_parser.add_argument(
+        '--clients', type=int, action='append',
+        help='Число одновременных клиентов; можно указать несколько раз.')
+    concurrency_parser.add_argument('--requests', type=int, default=200)
+    concurrency_parser.add_argument(
+        '--workers', type=int, default=4,
+        help='Синхронных WSGI-воркеров.')
+    concurrency_parser.add_argument(
+        '--threads', type=int, default=16,
+        help='Потоков пула ASGI-приложения.')
+    concurrency_parser.add_argument(
+        '--client-delay', type=float, default=0.0,
+        help='Сколько секунд клиент дочитывает ответ.')
+    concurrency_parser.add_argument('--anonymous', action='store_true')
+
+    contention_parser = commands.add_parser(
+        'contention',
+        help='Одновременные чтения и комментарии с профилями SQLite.')
+    contention_parser.add_argument('--readers', type=int, default=8)
+    contention_parser.add_argument('--writers', type=int, default=2)
+    contention_parser.add_argument(
+        '--duration', type=float, default=5.0,
+        help='Сколько секунд длится замер каждого профиля.')
+
+    args = parser.parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    os.environ.setdefault('YATUBE_DB', 'benchmark.sqlite3')
+    os.environ.setdefault('YATUBE_DEBUG', '0')
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    call_command('collectstatic', interactive=False, verbosity=0)
+    if args.command == 'seed':
+        call_command(
+            'seed', users=args.users, groups=args.groups, posts=args.posts,
+            comments=args.comments, follows=args.follows,
+            batch_size=args.batch_size, processes=args.processes,
+            seed=args.seed, skip_derived=args.skip_derived,
+        )
+        return 0
+
+    from django.db import connection
+
+    from posts.models import Post
+
+    from . import runner
+    if not Post.objects.exists():
+        print('База пуста: сначала запустите seed.', file=sys.stderr)
+        return 1
+    if args.command == 'concurrency':
+        from . import concurrency
+        reader, _ = runner.sample_values()
+        results = concurrency.compare(
+            args.url, clients=args.clients or (1, 10, 50),
+            requests=args.requests, workers=args.workers,
+            threads=args.threads, client_delay=args.client_delay,
+            user=None if args.anonymous else reader,
+        )
+        print(concurrency.format_results(results))
+        return 0
+    if args.command == 'contention':
+        from . import contention
+        results = contention.run(
+            readers=args.readers, writers=args.writers,
+            duration=args.duration,
+        )
+        print(contention.format_results(results))
+        return 0
+    results = runner.run(
+        requests=args.requests, warmup=args.warmup,
+        anonymous=args.anonymous, only=args.only,
+    )
+    baseline = runner.load_baseline(args.baseline) if args.baseline else None
+    print(runner.format_results(results, baseline))
+    if args.save:
+        runner.save_baseline(args.save, results, {
+            'python': platform.python_version(),
+            'database': connection.settings_dict['NAME'],
+            'posts': Post.objects.count(),
+            'requests': args.requests,
+            'anonymous': args.anonymous,
+        })
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
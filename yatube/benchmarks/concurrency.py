@@ -0,0 +1,133 @@
+"""Сравнение WSGI и ASGI под множеством одновременных клиентов.
+
+WSGI моделируется как синхронные воркеры gunicorn: не больше workers
+запросов одновременно, и воркер занят, пока медленный клиент
+дочитывает ответ (client_delay). ASGI — core.asgi.ASGIHandler в цикле
+событий: медленный клиент держит корутину, а в Django одновременно
+работает не больше threads потоков. Оба варианта выполняются в этом
+же процессе и обращаются к одной базе.
+"""
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import ASGIHandler
+
+from .runner import WSGIClient
+
+
+def summarize(latencies, elapsed, statuses):
+    cuts = (
+        statistics.quantiles(latencies, n=100, method='inclusive')
+        if len(latencies) > 1 else latencies * 99
+    )
+    return {
+        'status': max(statuses),
+        'p50': cuts[49] * 1000,
+        'p99': cuts[98] * 1000,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+def run_wsgi(url, clients, requests, workers, client_delay=0.0, user=None):
+    client = WSGIClient(user)
+    gate = threading.BoundedSemaphore(workers)
+
+    def one(_):
+        started = time.perf_counter()
+        with gate:
+            status = client.get(url)
+            time.sleep(client_delay)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    return summarize(
+        [latency for latency, _ in results], elapsed,
+        [status for _, status in results],
+    )
+
+
+async def _asgi_get(handler, url, cookie, client_delay):
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode('latin-1'),
+        'headers': [
+            (b'host', b'localhost'), (b'cookie', cookie.encode('latin-1')),
+        ],
+    }
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+        elif not message.get('more_body', False):
+            await asyncio.sleep(client_delay)
+
+    await handler(scope, receive, send)
+    return statuses[0]
+
+
+async def _run_asgi(handler, url, clients, requests, client_delay, cookie):
+    gate = asyncio.Semaphore(clients)
+
+    async def one():
+        async with gate:
+            started = time.perf_counter()
+            status = await _asgi_get(handler, url, cookie, client_delay)
+            return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return summarize(
+        [latency for latency, _ in results], elapsed,
+        [status for _, status in results],
+    )
+
+
+def run_asgi(url, clients, requests, threads, client_delay=0.0, user=None):
+    handler = ASGIHandler(get_wsgi_application(), threads)
+    try:
+        return asyncio.run(_run_asgi(
+            handler, url, clients, requests, client_delay,
+            WSGIClient(user).cookie,
+        ))
+    finally:
+        handler.executor.shutdown()
+
+
+def compare(url, clients=(1, 10, 50), requests=200, workers=4, threads=16,
+            client_delay=0.0, user=None):
+    results = {}
+    for count in clients:
+        results[f'wsgi x{workers} / {count}'] = run_wsgi(
+            url, count, requests, workers, client_delay, user)
+        results[f'asgi x{threads} / {count}'] = run_asgi(
+            url, count, requests, threads, client_delay, user)
+    return results
+
+
+def format_results(results):
+    lines = [
+        f'{"сервер / клиентов":<24} {"код":>4} {"p50":>8} {"p99":>8} '
+        f'{"rps":>8}'
+    ]
+    for name, row in results.items():
+        lines.append(
+            f'{name:<24} {row["status"]:>4} {row["p50"]:>8.2f} '
+            f'{row["p99"]:>8.2f} {row["rps"]:>8.1f}'
+        )
+    return '\n'.join(lines)
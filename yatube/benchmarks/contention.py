@@ -0,0 +1,132 @@
+"""Одновременные чтения и записи в SQLite через представления posts.
+
+Читатели по кругу открывают ленты и страницу поста, писатели
+отправляют комментарии через add_comment; все в одном процессе,
+каждый в своем потоке и со своим соединением. Замер повторяется для
+профиля SQLite по умолчанию (журнал DELETE, соединение на запрос) и
+для settings.SQLITE_PRAGMAS с CONN_MAX_AGE, чтобы было видно, сколько
+чтений и записей в секунду дает WAL и переиспользование соединений и
+сколько запросов заканчиваются ошибкой «database is locked».
+"""
+import itertools
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import reverse
+
+from .runner import WSGIClient, sample_values
+
+PLAIN_PRAGMAS = {'journal_mode': 'DELETE'}
+
+
+def profiles():
+    return {
+        'default': (PLAIN_PRAGMAS, 0),
+        'tuned': (
+            settings.SQLITE_PRAGMAS or {'journal_mode': 'WAL'},
+            settings.DATABASES[DEFAULT_DB_ALIAS]['CONN_MAX_AGE'] or 60,
+        ),
+    }
+
+
+def _latencies(values):
+    """p50 и p99 в миллисекундах."""
+    if len(values) < 2:
+        cuts = (values or [0.0]) * 99
+    else:
+        cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return cuts[49] * 1000, cuts[98] * 1000
+
+
+def _worker(client, action, deadline, latencies, errors):
+    # Ошибка базы под блокировкой приходит как 500 от обработчика.
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            status = action(client)
+        except Exception:
+            status = 500
+        if status >= 500:
+            errors.append(status)
+        else:
+            latencies.append(time.perf_counter() - started)
+
+
+def measure(readers=8, writers=2, duration=5.0):
+    reader, sample = sample_values()
+    read_urls = [
+        reverse('posts:index'),
+        reverse('posts:group_list', args=[sample['slug']]),
+        reverse('posts:profile', args=[sample['username']]),
+        reverse('posts:post_detail', args=[sample['post_id']]),
+    ]
+    comment_url = reverse('posts:add_comment', args=[sample['post_id']])
+    cycle = itertools.count()
+
+    def read(client):
+        return client.get(read_urls[next(cycle) % len(read_urls)])
+
+    def write(client):
+        return client.post(comment_url, {'text': 'Комментарий под нагрузкой'})
+
+    reads, writes, errors = [], [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(
+            WSGIClient(reader), action, deadline, latencies, errors
+        ))
+        for action, latencies, count in (
+            (read, reads, readers), (write, writes, writers),
+        )
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    read_p50, read_p99 = _latencies(reads)
+    write_p50, write_p99 = _latencies(writes)
+    return {
+        'reads': len(reads) / duration,
+        'writes': len(writes) / duration,
+        'read_p50': read_p50,
+        'read_p99': read_p99,
+        'write_p50': write_p50,
+        'write_p99': write_p99,
+        'errors': len(errors),
+    }
+
+
+def run(readers=8, writers=2, duration=5.0):
+    database = settings.DATABASES[DEFAULT_DB_ALIAS]
+    saved = settings.SQLITE_PRAGMAS, database['CONN_MAX_AGE']
+    results = {}
+    try:
+        for name, (pragmas, max_age) in profiles().items():
+            connections.close_all()
+            settings.SQLITE_PRAGMAS = pragmas
+            database['CONN_MAX_AGE'] = max_age
+            results[name] = measure(readers, writers, duration)
+    finally:
+        settings.SQLITE_PRAGMAS, database['CONN_MAX_AGE'] = saved
+        connections.close_all()
+    return results
+
+
+def format_results(results):
+    lines = [
+        f'{"профиль":<10} {"чтений/с":>9} {"записей/с":>10} '
+        f'{"чтение p50":>11} {"p99":>8} {"запись p50":>11} {"p99":>8} '
+        f'{"ошибок":>7}'
+    ]
+    for name, row in results.items():
+        lines.append(
+            f'{name:<10} {row["reads"]:>9.1f} {row["writes"]:>10.1f} '
+            f'{row["read_p50"]:>11.2f} {row["read_p99"]:>8.2f} '
+            f'{row["write_p50"]:>11.2f} {row["write_p99"]:>8.2f} '
+            f'{row["errors"]:>7}'
+        )
+    return '\n'.join(lines)
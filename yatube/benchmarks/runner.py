@@ -0,0 +1,212 @@
+"""Замеры маршрутов через WSGI-приложение в том же процессе."""
+import io
+import json
+import statistics
+import time
+from urllib.parse import unquote, urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY, get_user_model)
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.wsgi import get_wsgi_application
+from django.middleware.csrf import CSRF_TOKEN_LENGTH
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from about import urls as about_urls
+from core.instrumentation import collect_metrics
+from posts import urls as posts_urls
+from posts.models import Group, Post, UserCounters
+from users import urls as users_urls
+
+User = get_user_model()
+
+# GET на эти адреса меняет данные или сессию замеряющего клиента,
+# а выгрузки отдают все посты группы или автора целиком.
+SKIPPED = {
+    'posts:profile_follow', 'posts:profile_unfollow', 'users:logout',
+    'posts:group_export', 'posts:profile_export',
+}
+EXTRA = {
+    'posts:index': [{'page': '2'}],
+    'posts:search': [{'q': '{word}'}],
+}
+
+
+def sample_values():
+    """Значения параметров маршрутов из самых нагруженных объектов."""
+    reader = User.objects.get(pk=UserCounters.objects.order_by(
+        '-following_count'
+    ).values_list('user_id', flat=True).first())
+    author = User.objects.get(pk=UserCounters.objects.order_by(
+        '-posts_count'
+    ).values_list('user_id', flat=True).first())
+    post = Post.objects.order_by('-comments_count').only('text').first()
+    group = Group.objects.order_by('-posts_count').first()
+    return reader, {
+        'slug': group.slug if group else 'missing',
+        'username': author.username,
+        'post_id': post.pk if post else 1,
+        'word': post.text.split()[0].strip('.,') if post else 'пост',
+        'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+        'token': default_token_generator.make_token(reader),
+    }
+
+
+def routes(sample):
+    """Пары (имя, адрес) для всех маршрутов, кроме SKIPPED."""
+    for module in (posts_urls, users_urls, about_urls):
+        for pattern in module.urlpatterns:
+            name = f'{module.app_name}:{pattern.name}'
+            if name in SKIPPED:
+                continue
+            url = reverse(name, kwargs={
+                key: sample[key] for key in pattern.pattern.converters
+            })
+            yield name, url
+            for params in EXTRA.get(name, ()):
+                query = urlencode({
+                    key: value.format(**sample)
+                    for key, value in params.items()
+                })
+                yield f'{name}?{unquote(query)}', f'{url}?{query}'
+
+
+class WSGIClient:
+    """Вызывает WSGI-приложение напрямую, без сети и тестового клиента."""
+
+    def __init__(self, user=None):
+        self.application = get_wsgi_application()
+        # Одна и та же строка в cookie и в форме проходит проверку CSRF.
+        self.csrf_token = get_random_string(CSRF_TOKEN_LENGTH)
+        self.cookie = f'{settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+        if user is not None:
+            session = SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.create()
+            self.cookie += (
+                f'; {settings.SESSION_COOKIE_NAME}={session.session_key}'
+            )
+
+    def request(self, method, url, data=None):
+        path, _, query = url.partition('?')
+        body = b''
+        if data is not None:
+            body = urlencode(
+                {**data, 'csrfmiddlewaretoken': self.csrf_token}
+            ).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'HTTP_HOST': 'localhost',
+            'HTTP_COOKIE': self.cookie,
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(status)
+            return lambda data: None
+
+        response = self.application(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        return int(statuses[0].split()[0])
+
+    def get(self, url):
+        return self.request('GET', url)
+
+    def post(self, url, data):
+        return self.request('POST', url, data)
+
+
+def percentile(cuts, value):
+    return cuts[value - 1] if cuts else 0.0
+
+
+def measure(client, url, requests=100, warmup=5):
+    for _ in range(warmup):
+        client.get(url)
+    latencies = []
+    queries = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        with collect_metrics() as metrics:
+            request_started = time.perf_counter()
+            status = client.get(url)
+            latencies.append(time.perf_counter() - request_started)
+        queries.append(metrics.sql_count)
+    elapsed = time.perf_counter() - started
+    cuts = (
+        statistics.quantiles(latencies, n=100, method='inclusive')
+        if len(latencies) > 1 else latencies * 99
+    )
+    return {
+        'status': status,
+        'p50': percentile(cuts, 50) * 1000,
+        'p95': percentile(cuts, 95) * 1000,
+        'p99': percentile(cuts, 99) * 1000,
+        'rps': requests / elapsed if elapsed else 0.0,
+        'queries': max(queries),
+    }
+
+
+def run(requests=100, warmup=5, anonymous=False, only=None):
+    reader, sample = sample_values()
+    client = WSGIClient(None if anonymous else reader)
+    results = {}
+    for name, url in routes(sample):
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = measure(client, url, requests, warmup)
+    return results
+
+
+def format_results(results, baseline=None):
+    lines = [
+        f'{"маршрут":<40} {"код":>4} {"p50":>8} {"p95":>8} {"p99":>8} '
+        f'{"rps":>8} {"SQL":>4}'
+    ]
+    for name, row in results.items():
+        line = (
+            f'{name:<40} {row["status"]:>4} {row["p50"]:>8.2f} '
+            f'{row["p95"]:>8.2f} {row["p99"]:>8.2f} {row["rps"]:>8.1f} '
+            f'{row["queries"]:>4}'
+        )
+        old = (baseline or {}).get(name)
+        if old and old['p95']:
+            change = (row['p95'] - old['p95']) / old['p95'] * 100
+            line += f'  p95 {change:+.0f}%'
+            if row['queries'] != old['queries']:
+                line += f', SQL {old["queries"]}→{row["queries"]}'
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def load_baseline(path):
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def save_baseline(path, results, meta):
+    with open(path, 'w') as file:
+        json.dump(
+            {'meta': meta, 'results': results},
+            file, ensure_ascii=False, indent=2, sort_keys=True
+        )
+        file.write('\n')
@@ -0,0 +1,72 @@
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+from posts.seeding import Seeder
+
+from . import concurrency, contention, runner
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Seeder(users=20, groups=3, posts=60, comments=30, follows=40,
+               batch_size=25).run(log=lambda message: None)
+
+    def test_seed(self):
+        """seed создает связанные данные и пересчитывает производные."""
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+
+    def test_run_covers_routes(self):
+        """Замер обходит маршруты и считает перцентили и запросы."""
+        results = runner.run(requests=3, warmup=0)
+        self.assertIn('posts:index', results)
+        self.assertIn('users:login', results)
+        self.assertIn('about:tech', results)
+        self.assertNotIn('users:logout', results)
+        for name, row in results.items():
+            with self.subTest(name=name):
+                self.assertLess(row['status'], 500)
+                self.assertLessEqual(row['p50'], row['p99'])
+        self.assertEqual(results['posts:index']['status'], 200)
+        self.assertGreater(results['posts:index']['queries'], 0)
+        report = runner.format_results(results, baseline=results)
+        self.assertIn('p95 +0%', report)
+
+    def test_concurrency_compare(self):
+        """WSGI и ASGI замеряются на одном адресе под нагрузкой."""
+        results = concurrency.compare(
+            reverse('about:author'), clients=(3,), requests=6,
+            workers=1, threads=2,
+        )
+        self.assertEqual(
+            list(results), ['wsgi x1 / 3', 'asgi x2 / 3'])
+        for row in results.values():
+            self.assertEqual(row['status'], 200)
+            self.assertLessEqual(row['p50'], row['p99'])
+        self.assertIn('asgi x2 / 3', concurrency.format_results(results))
+
+
+class ContentionTests(TransactionTestCase):
+    # Потокам нужны данные, закоммиченные в базу, а не в транзакции теста.
+    def setUp(self):
+        Seeder(users=5, groups=2, posts=10, comments=5, follows=5,
+               batch_size=25).run(log=lambda message: None)
+
+    def test_contention_profiles(self):
+        """Чтения и комментарии замеряются для обоих профилей SQLite."""
+        results = contention.run(readers=1, writers=1, duration=0.3)
+        self.assertEqual(list(results), ['default', 'tuned'])
+        for row in results.values():
+            self.assertGreater(row['reads'], 0)
+            self.assertGreater(row['writes'], 0)
+            self.assertLessEqual(row['read_p50'], row['read_p99'])
+        self.assertIn('tuned', contention.format_results(results))
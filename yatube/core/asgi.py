@@ -0,0 +1,180 @@
+"""ASGI-приложение поверх WSGI-обработчика Django.
+
+Django 2.2 не поддерживает ни ASGI, ни асинхронные представления,
+поэтому запрос целиком — middleware, представление, ORM, миниатюры —
+выполняет синхронный обработчик в ограниченном пуле потоков, а цикл
+событий только принимает соединения, читает тело запроса и отдает
+ответ. Медленный клиент занимает корутину, а не поток: процесс
+держит сколько угодно открытых соединений, и одновременно в Django
+работает не больше settings.ASGI_THREADS запросов.
+
+Потоковый ответ читается в том же потоке, где его создало
+представление: соединения с базой привязаны к потоку, и итератор
+queryset нельзя продолжить в другом.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+MAX_BUFFERED_BODY = 2 * 1024 * 1024
+RESPONSE_QUEUE_SIZE = 8
+
+
+def _wsgi_path(path):
+    # WSGI передает путь байтами в латинице, как он пришел по сети.
+    return path.encode('utf-8').decode('latin-1')
+
+
+def build_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': _wsgi_path(scope.get('root_path', '')),
+        'PATH_INFO': _wsgi_path(scope['path']),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+class ASGIHandler:
+    def __init__(self, wsgi_application, max_workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        else:
+            raise ValueError(
+                f"Неподдерживаемый тип соединения: {scope['type']}"
+            )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(
+                    None, partial(self.executor.shutdown, wait=True)
+                )
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса; None, если клиент ушел, не дослав его."""
+        # Большие загрузки уходят из памяти во временный файл.
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_BUFFERED_BODY)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=RESPONSE_QUEUE_SIZE)
+        with body:
+            worker = loop.run_in_executor(
+                self.executor, self.respond,
+                build_environ(scope, body), queue, loop,
+            )
+            message = await queue.get()
+            try:
+                while message is not None:
+                    await send(message)
+                    message = await queue.get()
+            finally:
+                # Клиент ушел: дочитываем очередь, чтобы поток пула
+                # не остался ждать места в ней.
+                while message is not None:
+                    message = await queue.get()
+                await worker
+
+    def respond(self, environ, queue, loop):
+        """Выполняет WSGI-приложение в потоке пула.
+
+        Сообщения ответа кладутся в очередь цикла событий; поток ждет
+        только когда она полна, то есть медленный клиент задерживает
+        поток лишь на длинном потоковом ответе.
+        """
+        def put(message):
+            asyncio.run_coroutine_threadsafe(
+                queue.put(message), loop
+            ).result()
+
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start.update(
+                type='http.response.start',
+                status=int(status.split(' ', 1)[0]),
+                headers=[
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            )
+
+        iterable = None
+        try:
+            iterable = self.wsgi_application(environ, start_response)
+            put(start)
+            pending = None
+            for chunk in iterable:
+                if not chunk:
+                    continue
+                if pending is not None:
+                    put({
+                        'type': 'http.response.body',
+                        'body': pending,
+                        'more_body': True,
+                    })
+                pending = chunk
+            put({'type': 'http.response.body', 'body': pending or b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+            put(None)
+
+
+def get_asgi_application():
+    wsgi_application = get_wsgi_application()
+    return ASGIHandler(wsgi_application, settings.ASGI_THREADS)
@@ -0,0 +1,94 @@
+"""Чтение с реплик базы данных.
+
+Представления, помеченные декоратором replica_reads, читают из
+случайной реплики settings.DATABASE_REPLICAS; все остальное, включая
+любые записи, идет в основную базу. После запроса с изменяющим
+методом клиент получает cookie, и пока она жива, его чтения тоже
+идут в основную базу: так автор сразу видит свой пост или
+комментарий, даже если реплика еще не догнала основную базу.
+"""
+import random
+import sqlite3
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+
+def replica_reads(view):
+    """Разрешает представлению читать из реплик."""
+    view.replica_reads = True
+    return view
+
+
+def choose_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        if (
+            request.method not in SAFE_METHODS
+            and settings.DATABASE_REPLICAS
+        ):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            getattr(view_func, 'replica_reads', False)
+            and request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+        ):
+            _read_alias.set(choose_replica())
+
+
+def copy_database(target, source=DEFAULT_DB_ALIAS):
+    """Копирует SQLite-базу source в файл target через backup API."""
+    connection = connections[source]
+    if connection.vendor != 'sqlite':
+        raise ValueError(f'База {source} не SQLite')
+    connection.ensure_connection()
+    destination = sqlite3.connect(target)
+    try:
+        connection.connection.backup(destination)
+    finally:
+        destination.close()
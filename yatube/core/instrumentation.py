@@ -0,0 +1,103 @@
+"""Счетчики SQL-запросов и времени рендеринга шаблонов.
+
+collect_metrics() собирает число запросов, суммарное время в базе и
+время рендеринга шаблонов внутри блока with. Время шаблонов считается
+только для внешнего рендера, вложенные include и extends в него уже
+входят.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+_active = ContextVar('instrumentation_metrics', default=None)
+
+
+class Metrics:
+    def __init__(self):
+        self.queries = []
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.templates = []
+        self._template_depth = 0
+
+    @property
+    def sql_count(self):
+        return len(self.queries)
+
+    def as_dict(self):
+        return {
+            'sql_count': self.sql_count,
+            'sql_time': self.sql_time,
+            'template_time': self.template_time,
+        }
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.sql_time += duration
+            self.queries.append((context['connection'].alias, sql, duration))
+
+
+def _instrumented_render(render):
+    def wrapper(self, context):
+        metrics = _active.get()
+        if metrics is None:
+            return render(self, context)
+        metrics.templates.append(self.name)
+        metrics._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics._template_depth -= 1
+            if not metrics._template_depth:
+                metrics.template_time += time.perf_counter() - started
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _install():
+    if not getattr(Template.render, 'instrumented', False):
+        Template.render = _instrumented_render(Template.render)
+
+
+@contextmanager
+def collect_metrics():
+    _install()
+    metrics = Metrics()
+    token = _active.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(metrics.record_query)
+                )
+            yield metrics
+    finally:
+        _active.reset(token)
+
+
+def budget_for(url_name):
+    return settings.QUERY_BUDGETS.get(url_name)
+
+
+def check_budget(url_name, metrics, budget=None):
+    """Бросает AssertionError, если страница превысила бюджет запросов."""
+    budget = budget_for(url_name) if budget is None else budget
+    if budget is None or metrics.sql_count <= budget:
+        return
+    queries = '\n'.join(
+        f'{number}. [{alias}] {sql}'
+        for number, (alias, sql, _) in enumerate(metrics.queries, 1)
+    )
+    raise AssertionError(
+        f'{url_name}: {metrics.sql_count} SQL-запросов '
+        f'при бюджете {budget}:\n{queries}'
+    )
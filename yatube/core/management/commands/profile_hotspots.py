@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import pstats
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import (TIMINGS_FILE, view_directory,
+                            view_name_from_directory)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка профилей запросов из PROFILING_DIR: время ответа, SQL, '
+        'шаблоны и самые тяжелые функции по представлениям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'views', nargs='*',
+            help='Имена представлений, например posts:index.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=15,
+            help='Сколько функций показать для представления.'
+        )
+        parser.add_argument(
+            '--sort', choices=('cumulative', 'tottime', 'ncalls'),
+            default='cumulative',
+            help='Порядок функций в сводке cProfile.'
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(settings.PROFILING_DIR):
+            raise CommandError(
+                f'Профилей нет: каталог {settings.PROFILING_DIR} не найден.'
+            )
+        views = options['views'] or sorted(
+            view_name_from_directory(name)
+            for name in os.listdir(settings.PROFILING_DIR)
+        )
+        for view_name in views:
+            directory = view_directory(view_name)
+            if not os.path.isdir(directory):
+                self.stderr.write(f'Нет профилей для {view_name}')
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(view_name))
+            self.summarize_timings(directory)
+            self.summarize_profiles(directory, options)
+
+    def summarize_timings(self, directory):
+        path = os.path.join(directory, TIMINGS_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path) as file:
+            rows = [json.loads(line) for line in file if line.strip()]
+        if not rows:
+            return
+        times = sorted(row['time'] for row in rows)
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        sql_count = statistics.mean(row['sql_count'] for row in rows)
+        sql_time = statistics.mean(row['sql_time'] for row in rows)
+        template_time = statistics.mean(
+            row['template_time'] for row in rows
+        )
+        self.stdout.write(
+            f'  запросов: {len(rows)}, '
+            f'медиана {statistics.median(times) * 1000:.1f} мс, '
+            f'p95 {p95 * 1000:.1f} мс'
+        )
+        self.stdout.write(
+            f'  в среднем: SQL {sql_count:.1f} запросов за '
+            f'{sql_time * 1000:.1f} мс, шаблоны {template_time * 1000:.1f} мс'
+        )
+
+    def summarize_profiles(self, directory, options):
+        dumps = sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory) if name.endswith('.prof')
+        )
+        if not dumps:
+            return
+        buffer = io.StringIO()
+        stats = pstats.Stats(*dumps, stream=buffer)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(
+            options['limit']
+        )
+        self.stdout.write(buffer.getvalue())
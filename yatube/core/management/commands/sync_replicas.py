@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db import copy_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в файлы реплик из '
+        'settings.DATABASE_REPLICAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а копировать базу периодически.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Пауза между копиями в режиме --loop, секунды.'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте YATUBE_REPLICAS.'
+            )
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                connections[alias].close()
+                try:
+                    copy_database(connections[alias].settings_dict['NAME'])
+                except ValueError as error:
+                    raise CommandError(error)
+                if options['verbosity']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Реплика {alias} обновлена'
+                    ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
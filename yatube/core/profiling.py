@@ -0,0 +1,90 @@
+"""Выборочное профилирование запросов.
+
+ProfilingMiddleware профилирует долю settings.PROFILING_SAMPLE_RATE
+запросов. Для каждого такого запроса в PROFILING_DIR/<view> пишется
+строка в timings.jsonl (время ответа, число и время SQL-запросов,
+время шаблонов), а в режиме 'cprofile' еще и дамп cProfile.
+Сводку по самым тяжелым функциям печатает `manage.py profile_hotspots`.
+"""
+import cProfile
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from .instrumentation import collect_metrics
+
+TIMINGS_FILE = 'timings.jsonl'
+
+# cProfile нельзя запускать в нескольких потоках одновременно, поэтому
+# дамп снимается только если профилировщик свободен.
+_profiler_lock = threading.Lock()
+
+
+def view_directory(view_name):
+    return os.path.join(
+        settings.PROFILING_DIR, (view_name or 'unresolved').replace(':', '.')
+    )
+
+
+def view_name_from_directory(name):
+    return name.replace('.', ':')
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+        profiler = None
+        if (
+            settings.PROFILING_MODE == 'cprofile'
+            and _profiler_lock.acquire(blocking=False)
+        ):
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            with collect_metrics() as metrics:
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            if profiler is not None:
+                _profiler_lock.release()
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        self.save(
+            match.view_name if match else None,
+            request, response, elapsed, metrics, profiler
+        )
+        return response
+
+    def save(self, view_name, request, response, elapsed, metrics,
+             profiler):
+        directory = view_directory(view_name)
+        os.makedirs(directory, exist_ok=True)
+        if profiler is not None:
+            profiler.dump_stats(os.path.join(
+                directory, f'{int(time.time())}-{uuid.uuid4().hex[:8]}.prof'
+            ))
+        line = json.dumps({
+            'method': request.method,
+            'status': response.status_code,
+            'time': round(elapsed, 6),
+            'sql_count': metrics.sql_count,
+            'sql_time': round(metrics.sql_time, 6),
+            'template_time': round(metrics.template_time, 6),
+        })
+        with open(os.path.join(directory, TIMINGS_FILE), 'a') as file:
+            file.write(line + '\n')
@@ -0,0 +1,30 @@
+"""Профиль производительности SQLite.
+
+Прагмы из settings.SQLITE_PRAGMAS выполняются на каждом новом
+соединении с базой SQLite по сигналу connection_created:
+
+- journal_mode=WAL — читатели не ждут писателя, а писатель читателей;
+- synchronous=NORMAL — в режиме WAL fsync только на checkpoint, при
+  сбое питания теряются последние транзакции, но база цела;
+- mmap_size и cache_size — горячие страницы читаются из памяти;
+- busy_timeout — писатель ждет блокировку, а не сразу получает
+  «database is locked».
+
+Соединения живут CONN_MAX_AGE секунд, так что прагмы выполняются
+раз на соединение, а не раз на запрос. Прагмы идут мимо курсоров
+Django и не попадают в счетчики SQL-запросов страниц.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(connection, pragmas):
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite' and settings.SQLITE_PRAGMAS:
+        apply_pragmas(connection, settings.SQLITE_PRAGMAS)
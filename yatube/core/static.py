@@ -0,0 +1,126 @@
+"""Статика с хэшами в именах, предсжатыми копиями и вечным кэшем.
+
+collectstatic через CompressedManifestStaticFilesStorage кладет в
+STATIC_ROOT копии файлов с хэшем содержимого в имени и рядом с ними
+.gz и, если установлен пакет brotli, .br. Представление serve отдает
+подходящую под Accept-Encoding сжатую копию; файлы с хэшем в имени
+помечены immutable на год, поэтому браузер при повторных визитах не
+запрашивает их вовсе, а остальные перепроверяются по Last-Modified.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import cached_property
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.txt', '.json', '.xml',
+                '.map', '.html')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+_encodings = re.compile(r'\b(br|gzip)\b')
+
+
+def _compress_gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _compress_brotli(data):
+    return brotli.compress(data)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Манифест с хэшами плюс .gz и .br копии сжимаемых файлов."""
+
+    def compressors(self):
+        yield '.gz', _compress_gzip
+        if brotli is not None:
+            yield '.br', _compress_brotli
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run=dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(filter(None, names)):
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            data = file.read()
+        for suffix, compress in self.compressors():
+            compressed = compress(data)
+            # Копия, которая почти не меньше оригинала, не окупает
+            # лишний stat на каждый запрос.
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as file:
+                    file.write(compressed)
+
+    @cached_property
+    def immutable_names(self):
+        return frozenset(self.hashed_files.values())
+
+
+def _variant(path, accept_encoding):
+    """Путь к лучшей сжатой копии, которую примет клиент."""
+    accepted = set(_encodings.findall(accept_encoding))
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in accepted and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def serve(request, path):
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    stat = os.stat(fullpath)
+    immutable = path in getattr(
+        staticfiles_storage, 'immutable_names', frozenset()
+    )
+    if not immutable and not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+    filename, encoding = _variant(
+        fullpath, request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    content_type, _ = mimetypes.guess_type(fullpath)
+    response = FileResponse(
+        open(filename, 'rb'),
+        content_type=content_type or 'application/octet-stream',
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if immutable:
+        response['Cache-Control'] = (
+            f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        )
+    else:
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
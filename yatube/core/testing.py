@@ -0,0 +1,14 @@
+from django.urls import reverse
+
+from .instrumentation import check_budget, collect_metrics
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета SQL-запросов страницы из settings.QUERY_BUDGETS."""
+
+    def assertWithinQueryBudget(self, client, url_name, budget=None,
+                                **kwargs):
+        with collect_metrics() as metrics:
+            response = client.get(reverse(url_name, **kwargs))
+        check_budget(url_name, metrics, budget)
+        return response
@@ -1,4 +1,34 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import Http404, HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase)
+from django.urls import reverse
+from django.test.utils import override_settings
+
+from posts import views
+from posts.models import Post
+
+from .asgi import ASGIHandler
+from .cache import SQLiteCache, TieredCache
+from .db import (PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware,
+                 copy_database, replica_reads)
+from .static import serve
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +36,296 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
         self.assertEqual(response.status_code, 404)
+
+
+class SharedCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_sqlite_cache_shared_between_instances(self):
+        """Запись и удаление в одном экземпляре видны другому."""
+        first = SQLiteCache(self.location, {})
+        second = SQLiteCache(self.location, {})
+        first.set('key', {'value': 1})
+        self.assertEqual(second.get('key'), {'value': 1})
+        self.assertFalse(second.add('key', 'other'))
+        self.assertTrue(first.add('counter', 1))
+        self.assertEqual(second.incr('counter'), 2)
+        self.assertEqual(first.get('counter'), 2)
+        second.delete('key')
+        self.assertIsNone(first.get('key'))
+        first.set('expired', 1, timeout=0)
+        self.assertFalse(second.has_key('expired'))
+
+    def test_tiered_cache(self):
+        """Двухуровневый кеш читает из общего уровня и забывает удаленное."""
+        shared = SQLiteCache(self.location, {})
+        tiered = TieredCache(None, {'OPTIONS': {'LOCAL_MAX_ENTRIES': 1}})
+        with mock.patch.object(TieredCache, 'shared', shared):
+            shared.set('key', 'value')
+            self.assertEqual(tiered.get('key'), 'value')
+            shared.set('key', 'changed')
+            self.assertEqual(tiered.get('key'), 'value')
+            tiered.delete('key')
+            self.assertIsNone(tiered.get('key'))
+            tiered.set('first', 1)
+            tiered.set('second', 2)
+            shared.delete('first')
+            self.assertIsNone(tiered.get('first'))
+            self.assertEqual(tiered.get('second'), 2)
+
+    def test_tiered_cache_local_copy(self):
+        """Локальный уровень хранит копию и не живет дольше записи."""
+        shared = SQLiteCache(self.location, {})
+        tiered = TieredCache(None, {'OPTIONS': {'LOCAL_TIMEOUT': 60}})
+        with mock.patch.object(TieredCache, 'shared', shared):
+            value = ['cached']
+            tiered.set('list', value)
+            value.append('changed')
+            tiered.get('list').append('changed')
+            self.assertEqual(tiered.get('list'), ['cached'])
+            tiered.set('expired', 1, timeout=0)
+            self.assertIsNone(tiered.get('expired'))
+            with mock.patch('core.cache.time.monotonic') as monotonic:
+                monotonic.return_value = 0
+                tiered.set('short', 1, timeout=1)
+                shared.set('short', 2)
+                monotonic.return_value = 2
+                self.assertEqual(tiered.get('short'), 2)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(self, request, view):
+        """Возвращает базу, выбранную для чтения внутри представления."""
+        seen = []
+
+        def recording_view(request):
+            seen.append(self.router.db_for_read(None))
+            return HttpResponse()
+
+        if getattr(view, 'replica_reads', False):
+            recording_view = replica_reads(recording_view)
+        middleware = ReplicaRoutingMiddleware(
+            lambda request: middleware.process_view(
+                request, recording_view, (), {}
+            ) or recording_view(request)
+        )
+        response = middleware(request)
+        return seen[0], response
+
+    def test_feed_views_read_from_replica(self):
+        """Ленты и страница поста читают из реплик."""
+        for view in (views.index, views.group_posts, views.profile,
+                     views.post_detail, views.follow_index):
+            with self.subTest(view=view.__name__):
+                alias, _ = self.route(self.factory.get('/'), view)
+                self.assertIn(alias, ['replica1', 'replica2'])
+
+    def test_write_views_use_primary(self):
+        """Представления с записью читают и пишут в основную базу."""
+        for view in (views.post_create, views.post_edit,
+                     views.add_comment, views.profile_follow,
+                     views.profile_unfollow):
+            with self.subTest(view=view.__name__):
+                alias, _ = self.route(self.factory.get('/'), view)
+                self.assertIsNone(alias)
+        self.assertEqual(self.router.db_for_write(None), 'default')
+
+    def test_post_pins_client_to_primary(self):
+        """После POST клиент читает из основной базы, пока жива cookie."""
+        alias, response = self.route(self.factory.post('/'), views.index)
+        self.assertIsNone(alias)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        alias, _ = self.route(request, views.index)
+        self.assertIsNone(alias)
+        self.assertIsNone(self.router.db_for_read(None))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+class CopyDatabaseTests(TestCase):
+    def test_copy_database(self):
+        """Реплика получает копию схемы и данных основной базы."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        target = os.path.join(directory, 'replica.sqlite3')
+        copy_database(target)
+        connection = sqlite3.connect(target)
+        self.addCleanup(connection.close)
+        tables = {row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+        self.assertIn('posts_post', tables)
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    def connect(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        database = DatabaseWrapper({
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(directory, 'tuned.sqlite3'),
+        }, alias='tuned')
+        database.ensure_connection()
+        self.addCleanup(database.close)
+        return database.connection
+
+    def pragma(self, connection, name):
+        return connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+    })
+    def test_pragmas_on_new_connection(self):
+        """Новое соединение получает прагмы из SQLITE_PRAGMAS."""
+        connection = self.connect()
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+        # NORMAL — это 1.
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), 5000)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_no_pragmas(self):
+        """Без SQLITE_PRAGMAS соединение остается как есть."""
+        connection = self.connect()
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'delete')
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_sampled_request_profiled(self):
+        """Профиль запроса пишется в каталог представления."""
+        with self.settings(PROFILING_SAMPLE_RATE=1,
+                           PROFILING_DIR=self.directory):
+            self.client.get(reverse('posts:index'))
+            out = io.StringIO()
+            call_command('profile_hotspots', stdout=out, limit=5)
+        files = os.listdir(os.path.join(self.directory, 'posts.index'))
+        self.assertIn('timings.jsonl', files)
+        self.assertTrue(any(name.endswith('.prof') for name in files))
+        self.assertIn('posts:index', out.getvalue())
+        self.assertIn('запросов: 1', out.getvalue())
+
+    def test_timings_mode_and_disabled(self):
+        """Без выборки профили не пишутся, режим timings без cProfile."""
+        with self.settings(PROFILING_SAMPLE_RATE=0,
+                           PROFILING_DIR=self.directory):
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(os.listdir(self.directory), [])
+        with self.settings(PROFILING_SAMPLE_RATE=1,
+                           PROFILING_MODE='timings',
+                           PROFILING_DIR=self.directory):
+            self.client.get(reverse('about:author'))
+        self.assertEqual(
+            os.listdir(os.path.join(self.directory, 'about.author')),
+            ['timings.jsonl']
+        )
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(
+            STATIC_ROOT=self.directory,
+            STATICFILES_STORAGE=(
+                'core.static.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.factory = RequestFactory()
+
+    def test_hashed_file_is_immutable_and_precompressed(self):
+        """Файл с хэшем отдается сжатым и с вечным кэшем."""
+        name = staticfiles_storage.stored_name('css/bootstrap.min.css')
+        self.assertNotEqual(name, 'css/bootstrap.min.css')
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory, name + '.gz')
+        ))
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = serve(request, name)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertTrue(body.startswith(b'@charset'))
+        response.close()
+
+    def test_unhashed_file_revalidates(self):
+        """Файл без хэша перепроверяется по Last-Modified."""
+        response = serve(self.factory.get('/'), 'img/logo.png')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertNotIn('Content-Encoding', response)
+        response.close()
+        request = self.factory.get(
+            '/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(serve(request, 'img/logo.png').status_code, 304)
+        with self.assertRaises(Http404):
+            serve(self.factory.get('/'), '../manage.py')
+
+
+class ASGIHandlerTests(TransactionTestCase):
+    def setUp(self):
+        self.handler = ASGIHandler(get_wsgi_application(), max_workers=2)
+        self.addCleanup(self.handler.executor.shutdown)
+
+    def call(self, path, query_string=b''):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.handler({
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string,
+            'headers': [(b'host', b'testserver')],
+        }, receive, send))
+        return messages
+
+    def test_page_rendered_in_pool(self):
+        """Страница проходит через пул потоков и отдается целиком."""
+        user = User.objects.create_user(username='asgi')
+        Post.objects.create(author=user, text='Пост через ASGI')
+        start, body = self.call(reverse('posts:index'))
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      start['headers'])
+        self.assertIn('Пост через ASGI', body['body'].decode())
+        self.assertFalse(body.get('more_body', False))
+
+    def test_streaming_export(self):
+        """Потоковая выгрузка читается в потоке, где начат запрос."""
+        user = User.objects.create_user(username='asgi')
+        Post.objects.bulk_create(
+            Post(author=user, text=f'Пост {number}') for number in range(3)
+        )
+        start, *chunks = self.call(
+            reverse('posts:profile_export', args=['asgi']), b'format=csv'
+        )
+        self.assertEqual(start['status'], 200)
+        lines = b''.join(chunk['body'] for chunk in chunks).splitlines()
+        self.assertEqual(len(lines), 4)
@@ -0,0 +1,162 @@
+"""JSON API для чтения лент, профилей и постов.
+
+Данные выбираются через values(), без создания экземпляров моделей,
+листаются курсором (pub_date, id) без COUNT(*) и отдаются компактным
+JSON. Публичные ответы можно кэшировать где угодно на
+settings.API_CACHE_MAX_AGE секунд, лента подписок — только в браузере.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_safe
+
+from core.db import replica_reads
+
+from .models import Comment, Group, Post
+from .pagination import CursorPaginator
+from .timeline import feed_for
+
+User = get_user_model()
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author__username', 'group__slug', 'image',
+    'comments_count',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+
+public_cache = cache_control(public=True, max_age=settings.API_CACHE_MAX_AGE)
+private_cache = cache_control(
+    private=True, max_age=settings.API_CACHE_MAX_AGE
+)
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def not_found(message):
+    return json_response({'detail': message}, status=404)
+
+
+def serialize_post(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': settings.MEDIA_URL + row['image'] if row['image'] else None,
+        'comments_count': row['comments_count'],
+    }
+
+
+def serialize_comment(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def cursor_page(request, queryset, serialize, date_field='pub_date'):
+    page = CursorPaginator(
+        queryset, settings.POST_PAGE_COUNT,
+        date_field=date_field, pk_field='id'
+    ).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return {
+        'results': [serialize(row) for row in page],
+        'next': page.next_cursor or None,
+        'previous': page.previous_cursor or None,
+    }
+
+
+def posts_page(request, queryset):
+    return cursor_page(
+        request, queryset.values(*POST_FIELDS), serialize_post
+    )
+
+
+@require_safe
+@replica_reads
+@public_cache
+def index(request):
+    return json_response(posts_page(request, Post.objects.all()))
+
+
+@require_safe
+@replica_reads
+@public_cache
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'id', 'slug', 'title', 'description'
+    ).first()
+    if group is None:
+        return not_found('Группа не найдена')
+    posts = Post.objects.filter(group_id=group.pop('id'))
+    return json_response({'group': group, **posts_page(request, posts)})
+
+
+@require_safe
+@replica_reads
+@public_cache
+def profile(request, username):
+    author = User.objects.filter(username=username).values(
+        'id', 'username', 'first_name', 'last_name',
+        'counters__posts_count', 'counters__followers_count',
+        'counters__following_count',
+    ).first()
+    if author is None:
+        return not_found('Пользователь не найден')
+    posts = Post.objects.filter(author_id=author['id'])
+    return json_response({
+        'author': {
+            'username': author['username'],
+            'full_name': ' '.join(filter(None, (
+                author['first_name'], author['last_name']
+            ))),
+            'posts_count': author['counters__posts_count'],
+            'followers_count': author['counters__followers_count'],
+            'following_count': author['counters__following_count'],
+        },
+        **posts_page(request, posts),
+    })
+
+
+@require_safe
+@replica_reads
+@public_cache
+def post_detail(request, post_id):
+    post = Post.objects.filter(pk=post_id).values(*POST_FIELDS).first()
+    if post is None:
+        return not_found('Пост не найден')
+    comments = Comment.objects.filter(post_id=post_id).values(
+        *COMMENT_FIELDS
+    )
+    return json_response({
+        'post': serialize_post(post),
+        'comments': cursor_page(
+            request, comments, serialize_comment, date_field='created'
+        ),
+    })
+
+
+@require_safe
+@replica_reads
+@private_cache
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_response(
+            {'detail': 'Требуется авторизация'}, status=401
+        )
+    return json_response(posts_page(request, feed_for(request.user)))
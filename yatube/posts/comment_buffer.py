@@ -0,0 +1,292 @@
+"""Буферизованная запись комментариев: журнал на диске и bulk_create
+пачкой; журналы упавших процессов дописывает recover()."""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+from contextlib import suppress
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters
+from .bulk import batched, insert_as_is
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+JOURNAL_PREFIX = 'comments-'
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+JOURNAL_SUFFIX = '.jsonl'
+LOCK_SUFFIX = '.lock'
+PENDING_KEY = 'comments:pending:{}:{}'
+
+
+def journal_path(directory, name):
+    return os.path.join(directory, f'{JOURNAL_PREFIX}{name}{JOURNAL_SUFFIX}')
+
+
+def lock_path(journal):
+    return journal[:-len(JOURNAL_SUFFIX)] + LOCK_SUFFIX
+
+
+def journals(directory):
+    if not os.path.isdir(directory):
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.startswith(JOURNAL_PREFIX) and name.endswith(JOURNAL_SUFFIX)
+    ]
+
+
+def acquire(journal):
+    """Открытый файл блокировки журнала или None, если владелец жив."""
+    lock = open(lock_path(journal), 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
+
+
+def _dump(record):
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def read_journal(path):
+    records = []
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(file, 1):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Недописанная строка: процесс упал посреди записи,
+                # и клиент не получил ответа.
+                logger.warning('Пропущена строка %s журнала %s', number, path)
+    return records
+
+
+def _comment(record):
+    return Comment(
+        post_id=record['post'],
+        author_id=record['author'],
+        text=record['text'],
+        created=parse_datetime(record['created']),
+    )
+
+
+def _key(comment):
+    return comment.post_id, comment.author_id, comment.text, comment.created
+
+
+def _without_saved(comments):
+    saved = set(Comment.objects.filter(
+        post_id__in={comment.post_id for comment in comments},
+        created__in={comment.created for comment in comments},
+    ).values_list('post_id', 'author_id', 'text', 'created'))
+    return [comment for comment in comments if _key(comment) not in saved]
+
+
+def save_records(records, deduplicate=False):
+    """Пишет записи журнала одним bulk_create и обновляет счетчики.
+
+    Комментарии к удаленным постам и от удаленных авторов пропускаются,
+    иначе одна такая запись уронила бы всю пачку.
+    """
+    comments = [_comment(record) for record in records]
+    with transaction.atomic():
+        posts = set(Post.objects.filter(
+            pk__in={comment.post_id for comment in comments}
+        ).values_list('pk', flat=True))
+        authors = set(User.objects.filter(
+            pk__in={comment.author_id for comment in comments}
+        ).values_list('pk', flat=True))
+        comments = [
+            comment for comment in comments
+            if comment.post_id in posts and comment.author_id in authors
+        ]
+        if deduplicate and comments:
+            comments = _without_saved(comments)
+        insert_as_is(Comment, comments)
+        for post_id, count in Counter(
+                comment.post_id for comment in comments).items():
+            counters.bump(Post, post_id, 'comments_count', count)
+    return len(comments)
+
+
+def recover(directory, batch_size=None):
+    """Дописывает в базу журналы завершившихся процессов.
+
+    Пока журнал переигрывается, его блокировку держит этот процесс,
+    так что другой буфер или flush_comments его пропустят.
+    """
+    batch_size = batch_size or settings.COMMENT_FLUSH_SIZE
+    total = 0
+    for path in journals(directory):
+        lock = acquire(path)
+        if lock is None:
+            continue
+        try:
+            for batch in batched(read_journal(path), batch_size):
+                total += save_records(batch, deduplicate=True)
+            os.remove(path)
+        except FileNotFoundError:
+            # Журнал уже переиграл другой процесс.
+            pass
+        finally:
+            with suppress(FileNotFoundError):
+                os.remove(lock.name)
+            lock.close()
+    return total
+
+
+class CommentBuffer:
+    def __init__(self, directory, batch_size, interval):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.interval = interval
+        os.makedirs(directory, exist_ok=True)
+        self.path = journal_path(directory, uuid.uuid4().hex)
+        # Блокировка берется до создания журнала: журнала без живого
+        # владельца recover() не увидит, пока буфер работает.
+        self.owner = acquire(self.path)
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.queue = []
+        self.flushing = []
+        self.wakeup = threading.Event()
+        self.journal = open(self.path, 'a', encoding='utf-8')
+        if interval:
+            threading.Thread(
+                target=self.run, name='comment-buffer', daemon=True
+            ).start()
+
+    def submit(self, post_id, author_id, text):
+        record = {
+            'post': post_id,
+            'author': author_id,
+            'text': text,
+            'created': timezone.now().isoformat(),
+        }
+        with self.lock:
+            self.journal.write(_dump(record))
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.queue.append(record)
+            full = len(self.queue) >= self.batch_size
+        if full:
+            if self.interval:
+                self.wakeup.set()
+            else:
+                self.flush()
+        return record
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                self.flushing, self.queue = self.queue, []
+            if not self.flushing:
+                return 0
+            try:
+                saved = save_records(self.flushing)
+            except Exception:
+                with self.lock:
+                    self.queue = self.flushing + self.queue
+                    self.flushing = []
+                raise
+            with self.lock:
+                self.flushing = []
+                self._rewrite_journal()
+            return saved
+
+    def _rewrite_journal(self):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.writelines(_dump(record) for record in self.queue)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+        self.journal.close()
+        self.journal = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        """Сбрасывает очередь при выходе и убирает пустой журнал."""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Комментарии остались в журнале %s', self.path)
+            return
+        with self.lock:
+            if not self.queue:
+                self.journal.close()
+                os.remove(self.path)
+                os.remove(self.owner.name)
+                self.owner.close()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать пачку комментариев')
+            finally:
+                close_old_connections()
+
+
+def buffer():
+    """Буфер текущего процесса; журналы упавших процессов — в базу."""
+    global _buffer
+    config = (
+        settings.COMMENT_JOURNAL_DIR, settings.COMMENT_FLUSH_SIZE,
+        settings.COMMENT_FLUSH_INTERVAL, os.getpid(),
+    )
+    with _buffer_lock:
+        if _buffer is None or _buffer[0] != config:
+            recover(settings.COMMENT_JOURNAL_DIR)
+            _buffer = config, CommentBuffer(*config[:3])
+        return _buffer[1]
+
+
+@atexit.register
+def _close_buffer():
+    if _buffer is not None and _buffer[0][-1] == os.getpid():
+        _buffer[1].close()
+
+
+def submit(post_id, author_id, text):
+    record = buffer().submit(post_id, author_id, text)
+    # Индекс по посту и автору: странице поста не нужно читать журналы,
+    # а запрос автора может попасть в другой воркер.
+    key = PENDING_KEY.format(post_id, author_id)
+    cache.set(
+        key, cache.get(key, []) + [record], settings.COMMENT_PENDING_TIMEOUT
+    )
+    return record
+
+
+def pending_for(post_id, author_id):
+    """Еще не записанные комментарии автора к посту, как Comment."""
+    records = cache.get(PENDING_KEY.format(post_id, author_id))
+    if not records:
+        return []
+    # Записанные пачкой комментарии остаются в индексе до его таймаута.
+    comments = _without_saved([_comment(record) for record in records])
+    return sorted(comments, key=lambda comment: comment.created)
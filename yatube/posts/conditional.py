@@ -0,0 +1,87 @@
+"""Условные GET-запросы для лент и страницы поста: ETag из постов
+страницы считается до рендеринга, а загруженное запоминает remember()."""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def remember(request, name, factory):
+    """Значение, которое считается один раз за запрос."""
+    memo = request.__dict__.setdefault('_conditional_memo', {})
+    if name not in memo:
+        memo[name] = factory()
+    return memo[name]
+
+
+def remembered(request, name, default=None):
+    return request.__dict__.get('_conditional_memo', {}).get(name, default)
+
+
+def fingerprint(request, *parts):
+    return hashlib.md5(
+        repr((request.user.pk, *parts)).encode()
+    ).hexdigest()
+
+
+def card_version(post):
+    """Все, от чего зависит карточка поста в ленте."""
+    return (
+        post.pk, post.updated_at,
+        post.group.description if post.group_id else None,
+        post.author.username, post.author.get_full_name(),
+    )
+
+
+def page_shape(page_obj):
+    """Что меняет пагинатор страницы: число постов или соседей."""
+    if hasattr(page_obj.paginator, 'count'):
+        return page_obj.paginator.count
+    return page_obj.has_previous(), page_obj.has_next()
+
+
+def feed_state(request, page_obj, *parts):
+    """Валидаторы ленты по постам ее страницы."""
+    return {
+        'etag': fingerprint(
+            request, page_shape(page_obj),
+            [card_version(post) for post in page_obj], *parts
+        ),
+        # Пост может уйти со страницы, и максимум updated_at уменьшится:
+        # If-Modified-Since дал бы ложный 304.
+        'last_modified': None,
+    }
+
+
+def conditional_page(state_func):
+    """Отвечает 304, если состояние страницы не изменилось.
+
+    state_func(request, *args, **kwargs) возвращает словарь с ключами
+    etag и last_modified и вызывается не больше одного раза за запрос.
+    """
+    def state(request, *args, **kwargs):
+        return remember(
+            request, 'state',
+            lambda: state_func(request, *args, **kwargs)
+        )
+
+    def etag(request, *args, **kwargs):
+        return state(request, *args, **kwargs)['etag']
+
+    def last_modified(request, *args, **kwargs):
+        return state(request, *args, **kwargs)['last_modified']
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
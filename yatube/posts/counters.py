@@ -0,0 +1,87 @@
+"""Денормализованные счетчики постов, комментариев и подписок.
+
+Сигналы меняют счетчики атомарным UPDATE ... SET x = x + 1, а
+reconcile() пересчитывает их по исходным таблицам и чинит
+расхождения после bulk_create, QuerySet.update() и ручных правок.
+"""
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+def bump(model, pk, field, delta):
+    if pk is None:
+        return 0
+    return model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    if user_id is None:
+        return
+    if not bump(UserCounters, user_id, field, delta):
+        reconcile_users(User.objects.filter(pk=user_id))
+
+
+def for_user(user):
+    """Счетчики пользователя, даже если их строки еще нет.
+
+    Строки нет у пользователей, созданных bulk_create, loaddata или до
+    появления счетчиков: она создается и сразу пересчитывается.
+    """
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        reconcile_users(User.objects.filter(pk=user.pk))
+        # Строка только что записана, реплика может ее еще не видеть.
+        user.counters = UserCounters.objects.db_manager(
+            router.db_for_write(UserCounters)
+        ).get(user_id=user.pk)
+        return user.counters
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def _repair(queryset, field, actual):
+    return queryset.exclude(**{field: actual}).update(**{field: actual})
+
+
+def reconcile_users(users=None):
+    users = User.objects.all() if users is None else users
+    UserCounters.objects.bulk_create(
+        (UserCounters(user_id=pk) for pk in users.filter(
+            counters__isnull=True
+        ).values_list('pk', flat=True)),
+        ignore_conflicts=True,
+    )
+    counters = UserCounters.objects.filter(user__in=users)
+    return sum((
+        _repair(counters, 'posts_count', _count(Post.objects, 'author')),
+        _repair(
+            counters, 'followers_count', _count(Follow.objects, 'author')
+        ),
+        _repair(counters, 'following_count', _count(Follow.objects, 'user')),
+    ))
+
+
+def reconcile():
+    """Чинит все счетчики и возвращает число исправленных строк."""
+    return sum((
+        reconcile_users(),
+        _repair(Group.objects, 'posts_count', _count(Post.objects, 'group')),
+        _repair(
+            Post.objects, 'comments_count', _count(Comment.objects, 'post')
+        ),
+    ))
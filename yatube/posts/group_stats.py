@@ -0,0 +1,77 @@
+"""Сводная статистика групп для каталога групп.
+
+refresh() одним агрегирующим запросом считает посты каждой группы по
+авторам и перезаписывает таблицу GroupStats: число постов, время
+последнего поста и GROUP_STATS_TOP_AUTHORS самых активных авторов.
+Каталог читает только эту таблицу, поэтому его стоимость зависит от
+числа групп, а не постов. Таблицу пересчитывает команда
+`refresh_group_stats --loop` (или по расписанию без --loop); новые
+посты попадают в каталог со следующим пересчетом.
+"""
+import heapq
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+def _collect(top_authors):
+    """Итоги по группам и куча самых активных авторов каждой."""
+    totals = {}
+    rows = (
+        Post.objects.filter(group__isnull=False)
+        .order_by()
+        .values_list('group_id', 'author_id')
+        .annotate(total=Count('pk'), latest=Max('pub_date'))
+    )
+    for group_id, author_id, total, latest in rows.iterator():
+        posts_count, latest_post, authors = totals.get(
+            group_id, (0, None, [])
+        )
+        if latest_post is None or latest > latest_post:
+            latest_post = latest
+        # Куча ограничена top_authors, так что память — O(групп).
+        item = (total, -author_id)
+        if len(authors) < top_authors:
+            heapq.heappush(authors, item)
+        else:
+            heapq.heappushpop(authors, item)
+        totals[group_id] = posts_count + total, latest_post, authors
+    return totals
+
+
+def refresh(top_authors=None):
+    """Пересчитывает GroupStats и возвращает число групп."""
+    top_authors = top_authors or settings.GROUP_STATS_TOP_AUTHORS
+    totals = _collect(top_authors)
+    usernames = dict(User.objects.filter(pk__in={
+        -author for _, _, authors in totals.values()
+        for _, author in authors
+    }).values_list('pk', 'username'))
+    refreshed_at = timezone.now()
+    stats = []
+    for group_id in Group.objects.values_list('pk', flat=True):
+        posts_count, latest_post, authors = totals.get(
+            group_id, (0, None, [])
+        )
+        stats.append(GroupStats(
+            group_id=group_id,
+            posts_count=posts_count,
+            latest_post=latest_post,
+            top_authors=json.dumps([
+                (usernames[-author], total)
+                for total, author in sorted(authors, reverse=True)
+            ], ensure_ascii=False),
+            refreshed_at=refreshed_at,
+        ))
+    with transaction.atomic():
+        GroupStats.objects.all().delete()
+        GroupStats.objects.bulk_create(stats)
+    return len(stats)
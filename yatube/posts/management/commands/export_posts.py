@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в JSONL или CSV '
+        'потоком, не загружая таблицы в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', choices=bulk.MODELS,
+            help='Что выгружать; по умолчанию все модели. Для CSV — одна.'
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default='jsonl',
+            help='Формат файла.'
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='Путь к файлу; по умолчанию стандартный вывод.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из базы за раз.'
+        )
+        parser.add_argument(
+            '--progress-every', type=int, default=100000,
+            help='Как часто печатать прогресс, строк.'
+        )
+
+    def handle(self, *args, **options):
+        models = options['model'] or list(bulk.MODELS)
+        if options['format'] == 'csv' and len(models) != 1:
+            raise CommandError('Для CSV укажите ровно одну --model.')
+        if options['output']:
+            stream = open(
+                options['output'], 'w', encoding='utf-8', newline=''
+            )
+        else:
+            stream = self.stdout
+            stream.ending = ''
+        started = time.monotonic()
+        total = 0
+        try:
+            for model_name in models:
+                rows = bulk.export_rows(
+                    model_name, chunk_size=options['chunk_size']
+                )
+                if options['format'] == 'csv':
+                    rows = bulk.write_csv(stream, rows, model_name)
+                else:
+                    rows = bulk.write_jsonl(stream, rows, model_name)
+                for total, _ in enumerate(rows, total + 1):
+                    if total % options['progress_every'] == 0:
+                        self.progress(total, started, options)
+        finally:
+            if stream is not self.stdout:
+                stream.close()
+        self.progress(total, started, options)
+
+    def progress(self, total, started, options):
+        if options['verbosity']:
+            elapsed = time.monotonic() - started
+            self.stderr.write(
+                f'Выгружено строк: {total} за {elapsed:.1f} с'
+            )
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, UserCounters
+)
+
+BEFORE_ALIAS = 'feed_query_plans_before'
+
+
+def query_shapes(sample):
+    """Запросы лент в том виде, в каком их строят представления."""
+    per_page = settings.POST_PAGE_COUNT
+    return {
+        'index': Post.objects.select_related('group', 'author')[:per_page],
+        'group_list': Post.objects.filter(
+            group_id=sample['group']
+        ).select_related('author')[:per_page],
+        'profile': Post.objects.filter(
+            author_id=sample['author']
+        ).select_related('group')[:per_page],
+        'profile (подписка)': Follow.objects.filter(
+            user_id=sample['user'], author_id=sample['author']
+        ),
+        'follow_index': TimelineEntry.objects.filter(
+            user_id=sample['user']
+        ).order_by('-pub_date', '-post_id').values_list(
+            'pub_date', 'post_id'
+        )[:per_page],
+        'post_detail (комментарии)': Comment.objects.filter(
+            post_id=sample['post']
+        ).select_related('author').order_by(
+            'created', 'pk'
+        )[:settings.COMMENT_PAGE_COUNT],
+    }
+
+
+def busiest(queryset, field):
+    return queryset.order_by(f'-{field}').values_list(
+        'pk', flat=True
+    ).first()
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает планы запросов лент posts.views и их время. '
+        'С --compare план сравнивается с копией базы без составных '
+        'индексов Post и Comment.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', type=int, help='id группы.')
+        parser.add_argument('--author', type=int, help='id автора.')
+        parser.add_argument('--user', type=int, help='id читателя ленты.')
+        parser.add_argument('--post', type=int, help='id поста.')
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз выполнить запрос для замера времени.'
+        )
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Сравнить с копией базы без новых индексов (SQLite).'
+        )
+
+    def handle(self, *args, **options):
+        sample = {
+            'group': options['group'] or busiest(
+                Group.objects, 'posts_count'),
+            'author': options['author'] or busiest(
+                UserCounters.objects, 'posts_count'),
+            'user': options['user'] or busiest(
+                UserCounters.objects, 'following_count'),
+            'post': options['post'] or busiest(
+                Post.objects, 'comments_count'),
+        }
+        self.stdout.write(f'Образцы: {sample}')
+        aliases = [DEFAULT_DB_ALIAS]
+        if options['compare']:
+            aliases.insert(0, self.copy_without_indexes())
+        try:
+            for name, queryset in query_shapes(sample).items():
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                for alias in aliases:
+                    self.report(queryset.using(alias), alias, options)
+        finally:
+            if options['compare']:
+                self.drop_copy()
+
+    def report(self, queryset, alias, options):
+        label = 'до' if alias == BEFORE_ALIAS else 'после'
+        plan = queryset.explain()
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            list(queryset.all())
+        elapsed = (time.perf_counter() - started) / options['repeat']
+        self.stdout.write(f'  {label}: {elapsed * 1000:.2f} мс')
+        for line in plan.splitlines():
+            self.stdout.write(f'    {line}')
+
+    def copy_without_indexes(self):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != 'sqlite':
+            raise CommandError('--compare поддерживается только для SQLite.')
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connection.ensure_connection()
+        target = connections.databases[DEFAULT_DB_ALIAS].copy()
+        target['NAME'] = path
+        connections.databases[BEFORE_ALIAS] = target
+        copy = connections[BEFORE_ALIAS]
+        copy.ensure_connection()
+        connection.connection.backup(copy.connection)
+        with copy.cursor() as cursor:
+            for model in (Post, Comment):
+                for index in model._meta.indexes:
+                    cursor.execute(
+                        f'DROP INDEX IF EXISTS '
+                        f'{copy.ops.quote_name(index.name)}'
+                    )
+        return BEFORE_ALIAS
+
+    def drop_copy(self):
+        copy = connections[BEFORE_ALIAS]
+        path = copy.settings_dict['NAME']
+        copy.close()
+        del connections[BEFORE_ALIAS]
+        del connections.databases[BEFORE_ALIAS]
+        os.remove(path)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import comment_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает в базу комментарии из журналов завершившихся '
+        'процессов, например после падения или перезапуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory', default=settings.COMMENT_JOURNAL_DIR,
+            help='Каталог журналов комментариев.'
+        )
+
+    def handle(self, *args, **options):
+        saved = comment_buffer.recover(options['directory'])
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Записано комментариев: {saved}'
+            ))
@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Нарезает миниатюры для постов, у которых они еще не готовы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число потоков нарезки.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а проверять новые картинки.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Пауза между проходами в режиме --loop, секунды.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько постов брать из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                self.run_pass(pool, options)
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+    def run_pass(self, pool, options):
+        last_pk = None
+        while True:
+            queryset = thumbnails.pending().order_by('pk')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            ids = list(queryset.values_list(
+                'pk', flat=True
+            )[:options['batch_size']])
+            if not ids:
+                return
+            last_pk = ids[-1]
+            done = sum(pool.map(thumbnails.process, ids))
+            if options['verbosity']:
+                self.stdout.write(f'Миниатюры готовы: {done} из {len(ids)}')
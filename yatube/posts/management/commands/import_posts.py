@@ -0,0 +1,95 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from posts import bulk, counters, page_cache, search, timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из JSONL или CSV '
+        'пачками bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл экспорта или «-» для стандартного ввода.'
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default='jsonl',
+            help='Формат файла.'
+        )
+        parser.add_argument(
+            '--model', choices=bulk.MODELS,
+            help='Модель строк CSV-файла.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Размер пачки bulk_create.'
+        )
+        parser.add_argument(
+            '--progress-every', type=int, default=100000,
+            help='Как часто печатать прогресс, строк.'
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счетчики, ленты и поисковый индекс.'
+        )
+
+    def open_records(self, stream, options):
+        if options['format'] == 'csv':
+            return bulk.read_csv(stream, options['model'])
+        return bulk.read_jsonl(stream)
+
+    def handle(self, *args, **options):
+        if options['format'] == 'csv' and not options['model']:
+            raise CommandError('Для CSV укажите --model.')
+        if options['path'] == '-':
+            stream = sys.stdin
+        else:
+            stream = open(
+                options['path'], encoding='utf-8', newline=''
+            )
+        records = self.open_records(stream, options)
+        importer = bulk.Importer(options['batch_size'])
+        started = time.monotonic()
+        total = reported = 0
+        try:
+            for loaded in importer.load(records):
+                total += loaded
+                if total - reported >= options['progress_every']:
+                    reported = total
+                    self.progress(total, started, options)
+        except (KeyError, ValueError) as error:
+            raise CommandError(f'Ошибка в строке {total + 1}: {error!r}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.progress(total, started, options)
+        page_cache.clear()
+        if not options['skip_derived']:
+            self.rebuild_derived()
+        if options['verbosity']:
+            summary = ', '.join(
+                f'{name}: {count}' for name, count in importer.counts.items()
+            )
+            self.stdout.write(self.style.SUCCESS(f'Загружено — {summary}'))
+
+    def rebuild_derived(self):
+        counters.reconcile()
+        timeline.rebuild()
+        try:
+            search.rebuild_index()
+        except DatabaseError:
+            pass
+
+    def progress(self, total, started, options):
+        if options['verbosity']:
+            elapsed = time.monotonic() - started
+            rate = total / elapsed if elapsed else 0
+            self.stderr.write(
+                f'Загружено строк: {total} за {elapsed:.1f} с '
+                f'({rate:.0f} строк/с)'
+            )
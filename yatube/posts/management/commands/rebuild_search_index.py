@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс постов.'
+
+    def handle(self, *args, **options):
+        try:
+            indexed = search.rebuild_index()
+        except DatabaseError as error:
+            raise CommandError(error)
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Проиндексировано постов: {indexed}'
+            ))
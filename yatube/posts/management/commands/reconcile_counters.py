@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики и чинит расхождения.'
+
+    def handle(self, *args, **options):
+        repaired = counters.reconcile()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено счетчиков: {repaired}'
+            ))
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import group_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводную статистику групп для каталога групп.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-authors', type=int,
+            default=settings.GROUP_STATS_TOP_AUTHORS,
+            help='Сколько самых активных авторов хранить для группы.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а пересчитывать статистику периодически.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=60.0,
+            help='Пауза между пересчетами в режиме --loop, секунды.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            refreshed = group_stats.refresh(options['top_authors'])
+            if options['verbosity']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Пересчитано групп: {refreshed}'
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками пачками bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=5000)
+        parser.add_argument(
+            '--author-exponent', type=float, default=1.0,
+            help='Показатель степенного закона активности авторов.'
+        )
+        parser.add_argument(
+            '--follow-exponent', type=float, default=1.2,
+            help='Показатель степенного закона популярности авторов.'
+        )
+        parser.add_argument(
+            '--comment-exponent', type=float, default=0.8,
+            help='Показатель степенного закона комментариев к постам.'
+        )
+        parser.add_argument(
+            '--group-share', type=float, default=0.7,
+            help='Доля постов, опубликованных в группах.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Размер пачки bulk_create.'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Сколько процессов пишут непересекающиеся куски id.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счетчики, ленты и поисковый индекс.'
+        )
+
+    def handle(self, *args, **options):
+        seeder = Seeder(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            author_exponent=options['author_exponent'],
+            follow_exponent=options['follow_exponent'],
+            comment_exponent=options['comment_exponent'],
+            group_share=options['group_share'],
+            batch_size=options['batch_size'],
+            random_seed=options['seed'],
+        )
+        started = time.monotonic()
+        totals = seeder.run(
+            processes=options['processes'],
+            derived=not options['skip_derived'],
+            log=self.log if options['verbosity'] else lambda message: None,
+        )
+        if options['verbosity']:
+            elapsed = time.monotonic() - started
+            summary = ', '.join(
+                f'{name}: {count}' for name, count in totals.items()
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Создано за {elapsed:.1f} с — {summary}'
+            ))
+
+    def log(self, message):
+        self.stderr.write(message)
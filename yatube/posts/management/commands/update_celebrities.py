@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Отмечает авторов, перешедших порог TIMELINE_FANOUT_LIMIT, и '
+        'переносит их посты между лентами и чтением из Post.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а проверять порог периодически.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=60.0,
+            help='Пауза между проверками в режиме --loop, секунды.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            changed = timeline.update_celebrities()
+            if options['verbosity']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Авторов перешло порог: {changed}'
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_auto_20261018_0412'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='группа')),
+                ('posts_count', models.IntegerField(default=0, verbose_name='число постов')),
+                ('latest_post', models.DateTimeField(blank=True, null=True, verbose_name='последний пост')),
+                ('top_authors', models.TextField(default='[]', verbose_name='самые активные авторы')),
+                ('refreshed_at', models.DateTimeField(verbose_name='пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Статистика группы',
+                'verbose_name_plural': 'Статистика групп',
+            },
+        ),
+    ]
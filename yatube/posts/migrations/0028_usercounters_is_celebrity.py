@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_groupstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounters',
+            name='is_celebrity',
+            field=models.BooleanField(default=False, verbose_name='знаменитость'),
+        ),
+    ]
@@ -1,5 +1,9 @@
+import json
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Substr
 
 User = get_user_model()
 
@@ -8,6 +12,9 @@ class Group(models.Model):
     title = models.CharField('заголовок', max_length=200)
     slug = models.SlugField('слаг', unique=True)
     description = models.TextField('описание')
+    posts_count = models.IntegerField(
+        'число постов', default=0, editable=False
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -17,6 +24,60 @@ class Group(models.Model):
         return self.title
 
 
+class GroupStats(models.Model):
+    """Сводка по группе, которую пересчитывает group_stats.refresh()."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='группа'
+    )
+    posts_count = models.IntegerField('число постов', default=0)
+    latest_post = models.DateTimeField('последний пост', blank=True,
+                                       null=True)
+    top_authors = models.TextField('самые активные авторы', default='[]')
+    refreshed_at = models.DateTimeField('пересчитано')
+
+    class Meta:
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика групп'
+
+    @property
+    def active_authors(self):
+        """Пары (username, число постов) по убыванию числа постов."""
+        return json.loads(self.top_authors)
+
+
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'pub_date', 'updated_at', 'image', 'thumbnails_ready',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__slug', 'group__description',
+    )
+
+    def for_feed(self):
+        """Только колонки, которые нужны карточке поста в ленте.
+
+        Вместо полного текста выбирается его начало preview.
+        """
+        return self.select_related('group', 'author').only(
+            *self.FEED_FIELDS
+        ).annotate(
+            preview=Substr('text', 1, settings.POST_PREVIEW_LENGTH)
+        )
+
+    def count(self):
+        # С аннотацией preview Django считает COUNT(*) по подзапросу,
+        # который режет текст каждого поста; на число строк она не
+        # влияет, поэтому считается лента без нее.
+        if self._result_cache is None and 'preview' in self.query.annotations:
+            queryset = self._chain()
+            del queryset.query.annotations['preview']
+            return queryset.count()
+        return super().count()
+
+
 class Post(models.Model):
     text = models.TextField('текст', help_text='Введите текст поста')
     pub_date = models.DateTimeField(
@@ -44,15 +105,43 @@ class Post(models.Model):
         blank=True,
         null=True,
     )
+    comments_count = models.IntegerField(
+        'число комментариев', default=0, editable=False
+    )
+    updated_at = models.DateTimeField('дата изменения', auto_now=True)
+    thumbnails_ready = models.BooleanField(
+        'миниатюры готовы', default=False, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            models.Index(
+                fields=('group', '-pub_date'),
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='post_author_pub_date_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'group_id' in instance.__dict__:
+            instance._loaded_group_id = instance.group_id
+        if 'image' in instance.__dict__:
+            instance._loaded_image = instance.image.name
+        return instance
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -78,6 +167,12 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx'
+            ),
+        )
 
     def _str_(self) -> str:
         return self.text[:15]
@@ -97,4 +192,63 @@ class Follow(models.Model):
 
     class Meta:
         verbose_name = 'Подписчик'
-        verbose_name_plural = 'Подписчики'
\ No newline at end of file
+        verbose_name_plural = 'Подписчики'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow'
+            ),
+        )
+
+
+class UserCounters(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='пользователь'
+    )
+    posts_count = models.IntegerField('число постов', default=0)
+    followers_count = models.IntegerField('число подписчиков', default=0)
+    following_count = models.IntegerField('число подписок', default=0)
+    # Посты знаменитости не раскладываются по лентам подписчиков.
+    # Флаг меняет команда update_celebrities.
+    is_celebrity = models.BooleanField('знаменитость', default=False)
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='пост'
+    )
+    pub_date = models.DateTimeField('дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date'),
+                name='timeline_user_pub_date_idx'
+            ),
+        )
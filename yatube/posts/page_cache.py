@@ -0,0 +1,117 @@
+"""Кэш страниц лент: id постов страницы и общее число постов.
+
+Ключи строятся из ключа ленты ('index', 'group:<slug>',
+'profile:<username>') и ее поколения. Сигналы Post при создании,
+удалении и смене группы меняют поколение, старые записи перестают
+читаться и истекают по таймауту. При промахе страница выбирается
+обычным срезом и ее id запоминаются; при попадании посты собираются
+по id через in_bulk, поэтому горячие страницы не сортируют ленту.
+В ключ страницы входит и число постов, так что строки, добавленные
+bulk_create в обход сигналов, не подменяются старым списком id.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .models import Group
+
+User = get_user_model()
+
+ALL_FEEDS = '*'
+
+
+def index_key():
+    return 'index'
+
+
+def group_key(slug):
+    return f'group:{slug}'
+
+
+def profile_key(username):
+    return f'profile:{username}'
+
+
+def _generation_key(feed_key):
+    return f'feed:generation:{feed_key}'
+
+
+def generation(feed_key):
+    """Поколение ленты вместе с общим поколением всех лент."""
+    keys = [_generation_key(ALL_FEEDS), _generation_key(feed_key)]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, uuid4().hex, None)
+            found[key] = cache.get(key)
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def invalidate(*feed_keys):
+    cache.set_many(
+        {_generation_key(key): uuid4().hex for key in feed_keys}, None
+    )
+
+
+def invalidate_post(post, *group_ids):
+    """Сбрасывает ленты, в которых пост появился или пропал."""
+    feed_keys = [index_key()]
+    username = User.objects.filter(
+        pk=post.author_id
+    ).values_list('username', flat=True).first()
+    if username is not None:
+        feed_keys.append(profile_key(username))
+    group_ids = {pk for pk in (post.group_id, *group_ids) if pk is not None}
+    if group_ids:
+        feed_keys.extend(group_key(slug) for slug in Group.objects.filter(
+            pk__in=group_ids
+        ).values_list('slug', flat=True))
+    invalidate(*feed_keys)
+
+
+def clear():
+    """Сбрасывает все ленты, например после bulk_create в обход сигналов."""
+    invalidate(ALL_FEEDS)
+
+
+class CachedPaginator(Paginator):
+    """Paginator, который берет число постов и id страницы из кэша."""
+
+    def __init__(self, object_list, per_page, feed_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.feed_key = feed_key
+        self.timeout = settings.FEED_PAGE_CACHE_TIMEOUT
+
+    @cached_property
+    def generation(self):
+        return generation(self.feed_key)
+
+    @cached_property
+    def count(self):
+        key = f'feed:{self.feed_key}:{self.generation}:count'
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, self.timeout)
+        return count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        key = (
+            f'feed:{self.feed_key}:{self.generation}:{self.count}:'
+            f'{self.per_page}:{number}'
+        )
+        ids = cache.get(key)
+        if ids is None:
+            page = super().page(number)
+            page.object_list = list(page.object_list)
+            cache.set(key, [post.pk for post in page], self.timeout)
+            return page
+        posts = self.object_list.in_bulk(ids)
+        return self._get_page(
+            [posts[pk] for pk in ids if pk in posts], number, self
+        )
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return values
+
+
+def _value(obj, name):
+    if isinstance(obj, dict):
+        return obj[name]
+    return getattr(obj, name)
+
+
+class CursorPage(Sequence):
+    """Страница ленты без общего числа записей и номеров страниц."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return ''
+        return self.paginator.cursor_for(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return ''
+        return self.paginator.cursor_for(self.object_list[0])
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, pk) от новых записей к старым.
+
+    Вместо COUNT(*) и OFFSET страница выбирается условием на ключ
+    последней показанной записи, поэтому глубина страницы не влияет
+    на стоимость запроса.
+    """
+
+    def __init__(self, object_list, per_page,
+                 date_field='pub_date', pk_field='pk'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.date_field = date_field
+        self.pk_field = pk_field
+
+    def cursor_for(self, obj):
+        return encode_cursor([
+            _value(obj, self.date_field).isoformat(),
+            _value(obj, self.pk_field),
+        ])
+
+    def _parse(self, token):
+        values = decode_cursor(token)
+        if not values or len(values) != 2:
+            return None
+        date, pk = values
+        if not isinstance(date, str) or not isinstance(pk, int):
+            return None
+        date = parse_datetime(date)
+        if date is None:
+            return None
+        return date, pk
+
+    def _older_than(self, key):
+        date, pk = key
+        return self.object_list.filter(
+            **{f'{self.date_field}__lte': date}
+        ).exclude(
+            **{self.date_field: date, f'{self.pk_field}__gte': pk}
+        )
+
+    def _newer_than(self, key):
+        date, pk = key
+        return self.object_list.filter(
+            **{f'{self.date_field}__gte': date}
+        ).exclude(
+            **{self.date_field: date, f'{self.pk_field}__lte': pk}
+        )
+
+    def get_page(self, after=None, before=None):
+        """Возвращает страницу после курсора `after` или перед `before`.
+
+        Испорченный или пустой курсор означает первую страницу.
+        """
+        descending = (f'-{self.date_field}', f'-{self.pk_field}')
+        ascending = (self.date_field, self.pk_field)
+        before_key = self._parse(before)
+        if before_key is not None:
+            rows = list(
+                self._newer_than(before_key)
+                .order_by(*ascending)[:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            return CursorPage(rows, self, True, has_previous)
+        after_key = self._parse(after)
+        queryset = self.object_list
+        if after_key is not None:
+            queryset = self._older_than(after_key)
+        rows = list(queryset.order_by(*descending)[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(
+            rows[:self.per_page], self, has_next, after_key is not None
+        )
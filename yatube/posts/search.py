@@ -0,0 +1,159 @@
+"""Полнотекстовый поиск по постам через SQLite FTS5.
+
+Тексты постов лежат в виртуальной таблице posts_post_fts (rowid = id
+поста), которую синхронизируют сигналы сохранения и удаления Post.
+Результаты упорядочены по bm25-рангу и листаются курсором (rank, id);
+ранжируются только SEARCH_MAX_CANDIDATES самых новых совпадений.
+Если FTS5 недоступен, поиск деградирует до icontains по дате.
+"""
+import re
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router
+
+from .models import Post
+from .pagination import (CursorPage, CursorPaginator, decode_cursor,
+                         encode_cursor)
+
+FTS_TABLE = 'posts_post_fts'
+# С какой длины последнее слово запроса ищется как префикс.
+PREFIX_MIN_LENGTH = 3
+
+_available = {}
+
+
+def fts_available(alias):
+    if alias not in _available:
+        connection = connections[alias]
+        _available[alias] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _available[alias]
+
+
+def match_expression(query):
+    """Превращает строку пользователя в безопасный запрос FTS5.
+
+    Префиксом ищется только последнее, еще набираемое слово.
+    """
+    terms = [f'"{word}"' for word in re.findall(r'\w+', query or '')]
+    if terms and len(terms[-1]) - 2 >= PREFIX_MIN_LENGTH:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_post(post):
+    alias = router.db_for_write(Post, instance=post)
+    if not fts_available(alias):
+        return
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def unindex_post(post):
+    alias = router.db_for_write(Post, instance=post)
+    if not fts_available(alias):
+        return
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+
+
+def rebuild_index(using=None):
+    alias = using or router.db_for_write(Post)
+    if not fts_available(alias):
+        raise DatabaseError(f'Таблица {FTS_TABLE} недоступна в базе {alias}')
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}'
+        )
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+class SearchPaginator:
+    """Курсорная пагинация по рангу bm25 и id найденных постов."""
+
+    def __init__(self, query, per_page, queryset=None):
+        self.raw_query = (query or '').strip()
+        self.query = match_expression(query)
+        self.per_page = int(per_page)
+        self.candidates = settings.SEARCH_MAX_CANDIDATES
+        self.queryset = queryset if queryset is not None else Post.objects
+        self.alias = router.db_for_read(Post)
+
+    def cursor_for(self, post):
+        return encode_cursor([post.search_rank, post.pk])
+
+    def _parse(self, token):
+        values = decode_cursor(token)
+        if (
+            not values or len(values) != 2
+            or not isinstance(values[0], (int, float))
+            or not isinstance(values[1], int)
+        ):
+            return None
+        return values
+
+    def _ranked_ids(self, key, forward):
+        # Граница кандидатов — rowid самого старого из последних
+        # совпадений: FTS5 обходит совпадения по rowid без ранжирования.
+        sql = (
+            f'SELECT rowid, rank FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid >= COALESCE(('
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY rowid DESC LIMIT 1 OFFSET %s), 0)'
+        )
+        params = [self.query, self.query, self.candidates - 1]
+        if key is not None:
+            compare = '>' if forward else '<'
+            sql += (
+                f' AND (rank {compare} %s'
+                f' OR (rank = %s AND rowid {compare} %s))'
+            )
+            params += [key[0], key[0], key[1]]
+        order = 'ASC' if forward else 'DESC'
+        sql += f' ORDER BY rank {order}, rowid {order} LIMIT %s'
+        params.append(self.per_page + 1)
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _hydrate(self, rows):
+        posts = self.queryset.in_bulk([pk for pk, _ in rows])
+        page = []
+        for pk, rank in rows:
+            post = posts.get(pk)
+            if post is not None:
+                post.search_rank = rank
+                page.append(post)
+        return page
+
+    def get_page(self, after=None, before=None):
+        if not self.query:
+            return CursorPage([], self, False, False)
+        if not fts_available(self.alias):
+            return CursorPaginator(
+                self.queryset.filter(text__icontains=self.raw_query),
+                self.per_page,
+            ).get_page(after=after, before=before)
+        before_key = self._parse(before)
+        if before_key is not None:
+            rows = self._ranked_ids(before_key, forward=False)
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            return CursorPage(self._hydrate(rows), self, True, has_previous)
+        after_key = self._parse(after)
+        rows = self._ranked_ids(after_key, forward=True)
+        has_next = len(rows) > self.per_page
+        return CursorPage(
+            self._hydrate(rows[:self.per_page]), self, has_next,
+            after_key is not None
+        )
@@ -0,0 +1,322 @@
+"""Быстрое наполнение базы синтетическими данными.
+
+Пользователи получают один заранее посчитанный хэш пароля и пишутся
+bulk_create, посты, комментарии и подписки — готовыми кортежами через
+executemany; каждая пачка — одна транзакция. Посты и комментарии
+получают явные id, поэтому диапазоны id режутся на непересекающиеся
+куски, и при processes > 1 их генерируют и пишут несколько процессов.
+Сигналы при такой записи не срабатывают, так что счетчики, ленты,
+поисковый индекс и кэш страниц пересчитываются один раз в конце.
+
+Активность авторов, популярность (число подписчиков) и внимание к
+постам распределены по степенному закону: вес i-го по рангу
+элемента равен 1 / (i + 1) ** exponent.
+"""
+import itertools
+import multiprocessing
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from . import counters, group_stats, page_cache, search, timeline
+from .bulk import batched
+from .models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+PASSWORD = 'password'
+TEXT_POOL_SIZE = 2000
+CHUNK_SIZE = 50000
+
+LABELS = {'posts': 'Постов', 'comments': 'Комментариев', 'follows': 'Подписок'}
+
+_seeder = None
+
+
+def power_law_weights(size, exponent=1.0):
+    """Накопленные веса для random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(
+        1 / (rank + 1) ** exponent for rank in range(size)
+    ))
+
+
+def _max_pk(model):
+    return model.objects.aggregate(pk=Max('pk'))['pk'] or 0
+
+
+def _prepare_connection():
+    """Настройки SQLite на время заливки.
+
+    Без fsync и с ожиданием блокировок.
+    """
+    if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.execute('PRAGMA cache_size = -262144')
+            cursor.execute('PRAGMA busy_timeout = 60000')
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """Снимает вторичные индексы SQLite на время заливки.
+
+    Построить индекс по готовой таблице одной сортировкой намного
+    быстрее, чем обновлять его на каждую вставленную строку.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+            "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%%' "
+            f"AND tbl_name IN ({', '.join(['%s'] * len(tables))})",
+            tables,
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+
+
+def _run_task(task):
+    _prepare_connection()
+    kind, start, stop = task
+    return kind, getattr(_seeder, f'write_{kind}')(start, stop)
+
+
+class Seeder:
+    def __init__(self, users=1000, groups=20, posts=10000, comments=5000,
+                 follows=5000, author_exponent=1.0, follow_exponent=1.2,
+                 comment_exponent=0.8, group_share=0.7, batch_size=5000,
+                 random_seed=0):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.author_exponent = author_exponent
+        self.follow_exponent = follow_exponent
+        self.comment_exponent = comment_exponent
+        self.group_share = group_share
+        self.batch_size = batch_size
+        self.random_seed = random_seed
+        self.now = timezone.now()
+        Faker.seed(random_seed)
+        self.fake = Faker('ru_RU')
+        rng = self.random('texts')
+        self.texts = [
+            self.fake.paragraph(nb_sentences=rng.randint(1, 8))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+
+    def random(self, *key):
+        return random.Random(':'.join(map(str, (self.random_seed, *key))))
+
+    def _bulk_create(self, model, objects, **kwargs):
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+
+    def _insert(self, model, fields, rows, ignore_conflicts=False):
+        """Пишет кортежи значений колонок через executemany.
+
+        Миллион экземпляров модели и подготовка каждого поля в
+        bulk_create стоят в разы дороже самой вставки, поэтому
+        массовые таблицы пишутся готовыми строками.
+        """
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ', '.join(
+            connection.ops.quote_name(model._meta.get_field(name).column)
+            for name in fields
+        )
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = (
+            f'{connection.ops.insert_statement(ignore_conflicts)} {table} '
+            f'({columns}) VALUES ({placeholders})'
+        )
+        if ignore_conflicts:
+            sql += connection.ops.ignore_conflicts_suffix_sql(
+                ignore_conflicts
+            )
+        created = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+                created += cursor.rowcount
+        return created
+
+    def _datetime(self, seconds_ago):
+        return connection.ops.adapt_datetimefield_value(
+            self.now - timedelta(seconds=seconds_ago)
+        )
+
+    def create_users(self):
+        first = _max_pk(User) + 1
+        password = make_password(PASSWORD)
+        self._bulk_create(User, (User(
+            pk=pk,
+            username=f'user{pk}',
+            first_name=self.fake.first_name(),
+            last_name=self.fake.last_name(),
+            password=password,
+        ) for pk in range(first, first + self.users)))
+        self._bulk_create(UserCounters, (
+            UserCounters(user_id=pk)
+            for pk in range(first, first + self.users)
+        ), ignore_conflicts=True)
+        self.user_ids = list(range(first, first + self.users))
+
+    def create_groups(self):
+        first = _max_pk(Group) + 1
+        mixer.cycle(self.groups).blend(
+            Group,
+            slug=mixer.sequence(lambda number: f'group-{first + number}'),
+            title=mixer.faker.catch_phrase,
+            description=mixer.faker.text,
+        )
+        self.group_ids = list(Group.objects.filter(
+            pk__gte=first
+        ).values_list('pk', flat=True))
+
+    def plan(self):
+        """Куски id для постов, комментариев и подписок."""
+        self.first_post = _max_pk(Post) + 1
+        first_comment = _max_pk(Comment) + 1
+        tasks = []
+        for kind, first, total in (
+            ('posts', self.first_post, self.posts),
+            ('comments', first_comment, self.comments),
+            ('follows', 0, self.follows),
+        ):
+            tasks.extend(
+                (kind, start, min(start + CHUNK_SIZE, first + total))
+                for start in range(first, first + total, CHUNK_SIZE)
+            )
+        return tasks
+
+    def write_posts(self, start, stop):
+        rng = self.random('posts', start)
+        authors = power_law_weights(len(self.user_ids), self.author_exponent)
+        year = 365 * 86400
+
+        def rows():
+            for pk in range(start, stop):
+                pub_date = self._datetime(rng.randrange(year))
+                yield (
+                    pk,
+                    rng.choice(self.texts),
+                    pub_date,
+                    pub_date,
+                    rng.choices(self.user_ids, cum_weights=authors)[0],
+                    rng.choice(self.group_ids)
+                    if self.group_ids and rng.random() < self.group_share
+                    else None,
+                    '', 0, False,
+                )
+
+        return self._insert(Post, (
+            'id', 'text', 'pub_date', 'updated_at', 'author', 'group',
+            'image', 'comments_count', 'thumbnails_ready',
+        ), rows())
+
+    def write_comments(self, start, stop):
+        if not self.posts:
+            return 0
+        rng = self.random('comments', start)
+        post_ids = range(self.first_post, self.first_post + self.posts)
+        attention = power_law_weights(len(post_ids), self.comment_exponent)
+        month = 30 * 86400
+
+        def rows():
+            for pk in range(start, stop):
+                yield (
+                    pk,
+                    rng.choices(post_ids, cum_weights=attention)[0],
+                    rng.choice(self.user_ids),
+                    rng.choice(self.texts)[:200],
+                    self._datetime(rng.randrange(month)),
+                )
+
+        return self._insert(
+            Comment, ('id', 'post', 'author', 'text', 'created'), rows()
+        )
+
+    def write_follows(self, start, stop):
+        rng = self.random('follows', start)
+        popular = power_law_weights(len(self.user_ids), self.follow_exponent)
+
+        def rows():
+            for _ in range(start, stop):
+                user_id = rng.choice(self.user_ids)
+                author_id = rng.choices(self.user_ids, cum_weights=popular)[0]
+                if user_id != author_id:
+                    yield user_id, author_id
+
+        return self._insert(
+            Follow, ('user', 'author'), rows(), ignore_conflicts=True
+        )
+
+    def run(self, processes=1, derived=True, log=print):
+        global _seeder
+        self.create_users()
+        log(f'Пользователей: {len(self.user_ids)}')
+        self.create_groups()
+        log(f'Групп: {len(self.group_ids)}')
+        tasks = self.plan()
+        totals = dict.fromkeys(('posts', 'comments', 'follows'), 0)
+        _seeder = self
+        _prepare_connection()
+        try:
+            with deferred_indexes(Post, Comment, Follow):
+                if processes > 1 and connection.vendor == 'sqlite':
+                    results = self._run_parallel(tasks, processes)
+                else:
+                    results = (
+                        (kind, getattr(self, f'write_{kind}')(start, stop))
+                        for kind, start, stop in tasks
+                    )
+                for kind, created in results:
+                    totals[kind] += created
+                    log(f'{LABELS[kind]}: {totals[kind]}')
+                log('Строятся индексы')
+        finally:
+            _seeder = None
+        page_cache.clear()
+        if derived:
+            self.rebuild_derived(log)
+        return totals
+
+    def _run_parallel(self, tasks, processes):
+        # Дочерние процессы открывают свои соединения с базой.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(processes) as pool:
+            # Комментарии ссылаются на посты, поэтому пишутся после них.
+            for kinds in (('posts', 'follows'), ('comments',)):
+                yield from pool.imap_unordered(
+                    _run_task, [task for task in tasks if task[0] in kinds]
+                )
+
+    def rebuild_derived(self, log=print):
+        log(f'Исправлено счетчиков: {counters.reconcile()}')
+        log(f'Записей в лентах: {timeline.rebuild()}')
+        log(f'Пересчитано групп: {group_stats.refresh()}')
+        try:
+            log(f'Проиндексировано постов: {search.rebuild_index()}')
+        except DatabaseError:
+            pass
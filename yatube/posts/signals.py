@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, page_cache, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_loaded(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if not hasattr(instance, '_loaded_group_id') or not hasattr(
+            instance, '_loaded_image'):
+        loaded = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, None)
+        instance._loaded_group_id, instance._loaded_image = loaded
+
+
+@receiver(pre_save, sender=Post)
+def reset_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.image.name != getattr(instance, '_loaded_image', None):
+        instance.thumbnails_ready = False
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.image and not instance.thumbnails_ready:
+        thumbnails.schedule(instance)
+    instance._loaded_image = instance.image.name
+
+
+@receiver(post_save, sender=Post)
+def invalidate_feed_pages(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_group_id = getattr(instance, '_loaded_group_id', None)
+    if created or old_group_id != instance.group_id:
+        page_cache.invalidate_post(instance, old_group_id)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        counters.bump(Group, instance.group_id, 'posts_count', 1)
+    else:
+        old_group_id = getattr(instance, '_loaded_group_id', None)
+        if old_group_id != instance.group_id:
+            counters.bump(Group, old_group_id, 'posts_count', -1)
+            counters.bump(Group, instance.group_id, 'posts_count', 1)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def drop_feed_pages(sender, instance, **kwargs):
+    page_cache.invalidate_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.bump(UserCounters, instance.author_id, 'posts_count', -1)
+    counters.bump(Group, instance.group_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump(Post, instance.post_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.bump(Post, instance.post_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.bump(UserCounters, instance.author_id, 'followers_count', -1)
+    counters.bump(UserCounters, instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    timeline.remove(instance.user_id, instance.author_id)
@@ -0,0 +1,91 @@
+"""Потоковые ответы для лент и выгрузок постов."""
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from . import bulk
+
+CARDS_MARKER = mark_safe('<!-- stream-cards -->')
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': (bulk.write_csv, 'text/csv; charset=utf-8'),
+    'jsonl': (bulk.write_jsonl, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def _with_last(iterable):
+    """Пары (элемент, последний ли он) без загрузки всего списка."""
+    iterator = iter(iterable)
+    try:
+        previous = next(iterator)
+    except StopIteration:
+        return
+    for item in iterator:
+        yield previous, False
+        previous = item
+    yield previous, True
+
+
+def stream_feed(request, template_name, context,
+                card_template='includes/card.html'):
+    """Отдает уже прочитанную страницу ленты кусками: шапка, карточки
+    по мере рендеринга, хвост."""
+    shell = render_to_string(
+        template_name, {**context, 'stream_cards': CARDS_MARKER}, request
+    )
+    head, tail = shell.split(CARDS_MARKER, 1)
+    card = get_template(card_template)
+
+    def content():
+        yield head
+        for post, last in _with_last(context['page_obj']):
+            yield card.render({
+                **context, 'post': post, 'forloop': {'last': last},
+            }, request)
+        yield tail
+
+    return StreamingHttpResponse(content())
+
+
+class _Buffer:
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, value):
+        self.parts.append(value)
+        self.size += len(value)
+
+    def drain(self):
+        data = ''.join(self.parts)
+        self.parts.clear()
+        self.size = 0
+        return data
+
+
+def export_chunks(queryset, export_format):
+    """Строки выгрузки постов кусками примерно по EXPORT_CHUNK_SIZE."""
+    write, _ = EXPORT_FORMATS[export_format]
+    buffer = _Buffer()
+    rows = bulk.export_rows('post', queryset)
+    for _ in write(buffer, rows, 'post'):
+        if buffer.size >= EXPORT_CHUNK_SIZE:
+            yield buffer.drain()
+    # Заголовок CSV пишется и для пустой выгрузки.
+    if buffer.parts:
+        yield buffer.drain()
+
+
+def stream_export(queryset, export_format, filename):
+    _, content_type = EXPORT_FORMATS[export_format]
+    # Генератор читает базу уже после ReplicaRoutingMiddleware, поэтому
+    # реплика выбирается сейчас.
+    queryset = queryset.using(queryset.db)
+    response = StreamingHttpResponse(
+        export_chunks(queryset, export_format), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(POST_PAGE_COUNT=2)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='NoName1', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='NoName2')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group
+            ) for number in range(3)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def get(self, url_name, client=None, **params):
+        kwargs = params.pop('kwargs', {})
+        response = (client or self.client).get(
+            reverse(url_name, kwargs=kwargs), params)
+        return response, response.json()
+
+    def test_feed_cursor_pagination(self):
+        """Лента отдается страницами по курсору без COUNT(*)."""
+        with self.assertNumQueries(1):
+            response, first = self.get('posts:api_index')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertEqual(
+            [post['id'] for post in first['results']],
+            [self.posts[2].pk, self.posts[1].pk]
+        )
+        latest = first['results'][0]
+        self.assertTrue(latest.pop('pub_date'))
+        self.assertEqual(latest, {
+            'id': self.posts[2].pk,
+            'text': 'Пост 2',
+            'author': 'NoName1',
+            'group': 'test_slug',
+            'image': None,
+            'comments_count': 0,
+        })
+        _, second = self.get('posts:api_index', after=first['next'])
+        self.assertEqual(
+            [post['id'] for post in second['results']], [self.posts[0].pk])
+        self.assertIsNone(second['next'])
+
+    def test_group_and_profile(self):
+        """Лента группы и профиля содержат описание группы и автора."""
+        _, data = self.get(
+            'posts:api_group_list', kwargs={'slug': self.group.slug})
+        self.assertEqual(data['group']['description'], 'Тестовое описание')
+        self.assertEqual(len(data['results']), 2)
+        _, data = self.get(
+            'posts:api_profile', kwargs={'username': self.user.username})
+        self.assertEqual(data['author']['full_name'], 'Лев Толстой')
+        self.assertEqual(data['author']['posts_count'], 3)
+        self.assertEqual(data['author']['followers_count'], 1)
+        response, _ = self.get(
+            'posts:api_profile', kwargs={'username': 'nobody'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_detail_with_comments(self):
+        """Пост отдается вместе с комментариями."""
+        _, data = self.get(
+            'posts:api_post_detail', kwargs={'post_id': self.posts[0].pk})
+        self.assertEqual(data['post']['comments_count'], 1)
+        self.assertEqual(data['comments']['results'][0]['author'], 'NoName2')
+
+    def test_follow_feed_is_private(self):
+        """Лента подписок доступна только авторизованному пользователю."""
+        response, _ = self.get('posts:api_follow_index')
+        self.assertEqual(response.status_code, 401)
+        client = Client()
+        client.force_login(self.reader)
+        response, data = self.get('posts:api_follow_index', client=client)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+
+    def test_read_only(self):
+        """API не принимает изменяющие запросы."""
+        response = self.client.post(reverse('posts:api_index'))
+        self.assertEqual(response.status_code, 405)
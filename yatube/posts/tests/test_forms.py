@@ -1,12 +1,22 @@
+import io
+import json
+import os
 import shutil
 import tempfile
+from datetime import timedelta
 from http import HTTPStatus
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
+from .. import comment_buffer
 from ..forms import PostForm
 from ..models import Group, Post, User, Comment
 
@@ -188,7 +198,9 @@ class PostCreateFormTests(TestCase):
         )
 
     def test_comments_guest_redirect(self):
-        """Гость не может комментировать посты и перенаправляется на страницу логина."""
+        """Гость не может комментировать посты и перенаправляется
+        на страницу логина.
+        """
         comment_count = Comment.objects.count()
         response = self.guest_client.post(
             reverse(
@@ -197,7 +209,9 @@ class PostCreateFormTests(TestCase):
             data=self.comment_form_data,
             follow=True
         )
-        self.assertRedirects(response, f'/auth/login/?next=/posts/{self.post.id}/comment/')
+        self.assertRedirects(
+            response, f'/auth/login/?next=/posts/{self.post.id}/comment/'
+        )
         self.assertEqual(Comment.objects.count(), comment_count)
         self.assertTrue(
             Comment.objects.filter(
@@ -221,3 +235,148 @@ class PostCreateFormTests(TestCase):
         )
 
 
+class CommentBufferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.addCleanup(setattr, comment_buffer, '_buffer', None)
+        settings = override_settings(
+            COMMENT_BUFFERING=True,
+            COMMENT_FLUSH_INTERVAL=0,
+            COMMENT_FLUSH_SIZE=2,
+            COMMENT_JOURNAL_DIR=self.directory,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk})
+
+    def comment(self, text):
+        return self.author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': text},
+        )
+
+    def test_comments_flushed_by_batch(self):
+        """Комментарии копятся в журнале и пишутся пачкой."""
+        self.assertRedirects(self.comment('Первый'), self.detail_url)
+        self.assertFalse(Comment.objects.exists())
+        journal = comment_buffer.buffer().path
+        with open(journal, encoding='utf-8') as file:
+            self.assertIn('Первый', file.read())
+        response = self.author_client.get(self.detail_url)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Первый']
+        )
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        response = reader_client.get(self.detail_url)
+        self.assertEqual(len(response.context['comments']), 0)
+        self.comment('Второй')
+        self.assertEqual(
+            list(Comment.objects.order_by('created').values_list(
+                'text', flat=True)),
+            ['Первый', 'Второй']
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        self.assertEqual(os.path.getsize(journal), 0)
+
+    def test_missing_post_not_buffered(self):
+        """Комментарий к несуществующему посту — 404."""
+        response = self.author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': 0}),
+            data={'text': 'Текст'},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_recover_journal_of_dead_process(self):
+        """Журнал упавшего процесса дописывается без дубликатов."""
+        saved = Comment.objects.create(
+            post=self.post, author=self.reader, text='Уже в базе')
+        records = [
+            {'post': self.post.pk, 'author': self.reader.pk,
+             'text': 'Уже в базе', 'created': saved.created.isoformat()},
+            {'post': self.post.pk, 'author': self.reader.pk,
+             'text': 'Из журнала', 'created': saved.created.isoformat()},
+        ]
+        path = comment_buffer.journal_path(self.directory, 'упавший')
+        with open(path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            file.write('{"post": ')
+        out = io.StringIO()
+        with self.assertLogs('posts.comment_buffer', 'WARNING'):
+            call_command(
+                'flush_comments', directory=self.directory, stdout=out)
+        self.assertIn('Записано комментариев: 1', out.getvalue())
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def write_journal(self, name, records):
+        path = comment_buffer.journal_path(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return path
+
+    def test_pending_comments_of_other_process(self):
+        """Автор видит свой комментарий из буфера другого процесса по
+        индексу в кеше, а журнал живого процесса не переигрывается, пока
+        тот держит блокировку."""
+        record = {
+            'post': self.post.pk, 'author': self.user.pk,
+            'text': 'Из другого воркера',
+            'created': timezone.now().isoformat(),
+        }
+        path = self.write_journal('другой', [record])
+        cache.set(
+            comment_buffer.PENDING_KEY.format(self.post.pk, self.user.pk),
+            [record]
+        )
+        owner = comment_buffer.acquire(path)
+        self.addCleanup(owner.close)
+        response = self.author_client.get(self.detail_url)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Из другого воркера']
+        )
+        self.assertEqual(comment_buffer.recover(self.directory), 0)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        with mock.patch.object(
+                comment_buffer, 'journals', side_effect=AssertionError):
+            response = reader_client.get(self.detail_url)
+        self.assertEqual(len(response.context['comments']), 0)
+        owner.close()
+        self.assertEqual(comment_buffer.recover(self.directory), 1)
+        response = self.author_client.get(self.detail_url)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Из другого воркера']
+        )
+
+    def test_journal_dates_saved_without_touching_fields(self):
+        """Время комментария берется из журнала, а auto_now_add поля
+        created не выключается даже на время записи."""
+        created = timezone.now() - timedelta(days=1)
+        field = Comment._meta.get_field('created')
+        with mock.patch.object(
+                field, 'pre_save', side_effect=AssertionError):
+            comment_buffer.save_records([{
+                'post': self.post.pk, 'author': self.user.pk,
+                'text': 'Вчерашний', 'created': created.isoformat(),
+            }])
+        self.assertTrue(field.auto_now_add)
+        self.assertEqual(Comment.objects.get().created, created)
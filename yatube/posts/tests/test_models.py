@@ -1,7 +1,14 @@
+import io
+import tempfile
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, UserCounters
 
 User = get_user_model()
 
@@ -57,3 +64,239 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Другое описание',
+        )
+
+    def assertCounters(self, user, **expected):
+        counters = UserCounters.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(counters, field), value)
+
+    def test_post_counters(self):
+        """Посты меняют счетчики автора и группы."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group)
+        self.assertCounters(self.user, posts_count=1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+        post.delete()
+        self.assertCounters(self.user, posts_count=0)
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Комментарии и подписки меняют свои счетчики."""
+        post = Post.objects.create(author=self.user, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        self.assertCounters(self.user, followers_count=1)
+        self.assertCounters(self.reader, following_count=1)
+        follow.delete()
+        self.assertCounters(self.user, followers_count=0)
+        self.assertCounters(self.reader, following_count=0)
+
+    def test_reconcile_counters(self):
+        """reconcile_counters чинит разошедшиеся счетчики."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Пост', group=self.group),
+            Post(author=self.user, text='Пост'),
+        ])
+        UserCounters.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', verbosity=0)
+        self.assertCounters(self.user, posts_count=2)
+        self.assertCounters(self.reader, posts_count=0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+    def test_pages_without_counters_row(self):
+        """Страницы автора без строки счетчиков создают ее, а не падают."""
+        post = Post.objects.create(author=self.user, text='Пост')
+        UserCounters.objects.filter(user=self.user).delete()
+        for url in (
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+        self.assertCounters(self.user, posts_count=1)
+
+
+class ImportExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='bulk_group', description='Описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            ) for number in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self, *args):
+        out = io.StringIO()
+        call_command('export_posts', *args, stdout=out, verbosity=0)
+        return out.getvalue()
+
+    def test_jsonl_round_trip(self):
+        """После экспорта и импорта сохраняются id, даты и связи."""
+        dump = self.export()
+        expected = list(Post.objects.order_by('pk').values_list(
+            'pk', 'text', 'pub_date', 'author__username', 'group__slug'
+        ))
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.filter(username='writer').delete()
+        source = io.StringIO(dump)
+        with mock.patch('sys.stdin', source):
+            call_command('import_posts', '-', verbosity=0, batch_size=2)
+        self.assertEqual(list(Post.objects.order_by('pk').values_list(
+            'pk', 'text', 'pub_date', 'author__username', 'group__slug'
+        )), expected)
+        self.assertEqual(Comment.objects.get().post_id, self.posts[0].pk)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author__username='writer'
+        ).exists())
+        author = User.objects.get(username='writer')
+        self.assertEqual(author.counters.posts_count, 3)
+        self.assertEqual(Group.objects.get().posts_count, 3)
+
+    def test_import_creates_counters_without_derived(self):
+        """Импорт создает строки счетчиков новым авторам и без пересчета."""
+        dump = self.export('--model', 'post', '--format', 'csv')
+        Post.objects.all().delete()
+        User.objects.filter(username='writer').delete()
+        with mock.patch('sys.stdin', io.StringIO(dump)):
+            call_command(
+                'import_posts', '-', format='csv', model='post',
+                skip_derived=True, verbosity=0,
+            )
+        author = User.objects.get(username='writer')
+        self.assertTrue(UserCounters.objects.filter(user=author).exists())
+
+    def test_import_skips_existing_rows(self):
+        """Повторный импорт не создает дубликатов."""
+        dump = self.export('--model', 'post', '--format', 'csv')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write(dump)
+            file.flush()
+            call_command(
+                'import_posts', file.name, format='csv', model='post',
+                verbosity=0,
+            )
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_csv_needs_single_model(self):
+        """CSV выгружается только для одной модели."""
+        with self.assertRaises(CommandError):
+            self.export('--format', 'csv')
+
+
+class SeedCommandTest(TestCase):
+    @mock.patch('posts.seeding.CHUNK_SIZE', 8)
+    def test_seed_creates_linked_rows(self):
+        """seed пишет данные кусками и пересчитывает счетчики."""
+        call_command(
+            'seed', users=10, groups=2, posts=30, comments=12, follows=15,
+            batch_size=7, verbosity=0,
+        )
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 12)
+        self.assertTrue(Follow.objects.exists())
+        user = User.objects.first()
+        self.assertTrue(user.check_password('password'))
+        self.assertEqual(
+            user.counters.posts_count, user.posts.count()
+        )
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+
+
+class FollowConstraintTest(TestCase):
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора запрещена базой."""
+        user = User.objects.create_user(username='fan')
+        author = User.objects.create_user(username='star')
+        Follow.objects.create(user=user, author=author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_feed_query_plans_command(self):
+        """Команда печатает план запроса для каждой ленты."""
+        out = io.StringIO()
+        call_command('feed_query_plans', repeat=1, stdout=out)
+        for name in ('index', 'group_list', 'profile', 'follow_index'):
+            self.assertIn(name, out.getvalue())
+
+
+class FeedQuerySetTest(TestCase):
+    @override_settings(POST_PREVIEW_LENGTH=10)
+    def test_for_feed_loads_preview_only(self):
+        """Лента выбирает начало текста и не грузит лишние колонки."""
+        user = User.objects.create_user(username='auth', first_name='Имя')
+        group = Group.objects.create(
+            title='Группа', slug='feed_group', description='Описание')
+        Post.objects.create(
+            author=user, group=group, text='Очень длинный текст поста')
+        with self.assertNumQueries(1):
+            post = Post.objects.for_feed().get()
+            self.assertEqual(post.preview, 'Очень длин')
+            self.assertEqual(post.author.get_full_name(), 'Имя')
+            self.assertEqual(post.group.description, 'Описание')
+        self.assertIn('text', post.get_deferred_fields())
+        self.assertIn('password', post.author.get_deferred_fields())
+        self.assertIn('title', post.group.get_deferred_fields())
+
+    def test_for_feed_count_without_preview(self):
+        """Число постов ленты считается без подзапроса с preview."""
+        user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=user, text=f'Пост {number}') for number in range(3)
+        )
+        with self.assertNumQueries(1) as queries:
+            self.assertEqual(Post.objects.for_feed().count(), 3)
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('SUBSTR', sql)
+        self.assertNotIn('subquery', sql)
@@ -0,0 +1,183 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import thumbnails
+from ..models import Post
+from ..thumbnails import generate
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            ),
+        )
+
+    def test_placeholder_until_ready(self):
+        """Пока миниатюры не готовы, страницы показывают заглушку."""
+        self.assertFalse(self.post.thumbnails_ready)
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Изображение обрабатывается')
+        self.assertTrue(generate(self.post.pk))
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Изображение обрабатывается')
+        self.assertContains(response, '<img class="card-img my-2"')
+
+    def test_new_image_resets_ready_flag(self):
+        """Замена картинки снова включает заглушку."""
+        generate(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка без картинки'
+        post.save()
+        self.assertTrue(post.thumbnails_ready)
+        post.image = SimpleUploadedFile(
+            name='other.gif', content=SMALL_GIF, content_type='image/gif')
+        post.save()
+        self.assertFalse(post.thumbnails_ready)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_RETRY_DELAY=0)
+class ThumbnailRecoveryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Фоновые функции закрывают соединение, а тест идет в транзакции.
+        patcher = mock.patch.object(thumbnails, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, thumbnails, '_swept', None)
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            ),
+        )
+
+    def test_failed_generation_retried(self):
+        """Ошибка нарезки повторяется THUMBNAIL_RETRIES раз."""
+        with mock.patch.object(
+                thumbnails, 'generate',
+                side_effect=[OSError, OSError, True]) as generate_mock:
+            self.assertTrue(thumbnails.process(self.post.pk))
+        self.assertEqual(generate_mock.call_count, 3)
+        with mock.patch.object(
+                thumbnails, 'generate', side_effect=OSError):
+            self.assertFalse(thumbnails.process(self.post.pk))
+
+    def test_inline_when_pool_stopped(self):
+        """Без пула потоков миниатюры режутся сразу."""
+        pool = mock.Mock()
+        pool.submit.side_effect = RuntimeError
+        with mock.patch.object(thumbnails, 'executor', return_value=pool):
+            thumbnails._submit(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnails_ready)
+
+    def test_stale_posts_swept(self):
+        """Пул подбирает посты, чьи задачи потерялись, но не трогает
+        свежие."""
+        pool = mock.Mock()
+        with mock.patch.object(thumbnails, 'executor', return_value=pool):
+            thumbnails._submit(self.post.pk)
+            thumbnails._submit(self.post.pk)
+        self.assertEqual(
+            [call.args[0] for call in pool.submit.call_args_list],
+            [thumbnails.sweep, thumbnails.process, thumbnails.process]
+        )
+        self.assertEqual(thumbnails.sweep(), 0)
+        Post.objects.filter(pk=self.post.pk).update(
+            updated_at=timezone.now() - timedelta(
+                seconds=settings.THUMBNAIL_STALE_SECONDS + 1
+            )
+        )
+        self.assertEqual(thumbnails.sweep(), 1)
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnails_ready)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_PREGENERATE='worker'
+)
+class ThumbnailWorkerTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate_thumbnails_command(self):
+        """Воркер нарезает миниатюры для всех ожидающих постов."""
+        user = User.objects.create_user(username='NoName')
+        posts = [Post.objects.create(
+            author=user,
+            text=f'Пост {number}',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            ),
+        ) for number in range(3)]
+        # Общая in-memory база тестов не ждет блокировок, поэтому
+        # параллельные записи из пула потоков здесь не проверяются.
+        call_command(
+            'generate_thumbnails', batch_size=2, workers=1, verbosity=0)
+        for post in posts:
+            post.refresh_from_db()
+            self.assertTrue(post.thumbnails_ready)
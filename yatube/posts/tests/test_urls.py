@@ -71,8 +71,8 @@ class PostURLTests(TestCase):
         )
 
     def test_posts_edit_url_redirect_anonymous_on_login(self):
-        """Страница по адресу /posts/<int:post_id>/edit/ перенаправит анонимного
-        пользователя на страницу логина.
+        """Страница по адресу /posts/<int:post_id>/edit/ перенаправит
+        анонимного пользователя на страницу логина.
         """
         response = self.guest_client.get(
             f'/posts/{self.post.id}/edit/', follow=True)
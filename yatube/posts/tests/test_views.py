@@ -1,9 +1,22 @@
+from datetime import timedelta
+from unittest import mock
+
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.core.paginator import Page
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from ..models import Follow, Group, Post
+from django.utils import timezone
+
+from core.testing import QueryBudgetMixin
+from .. import bulk, page_cache, search
+from ..models import (Comment, Follow, Group, GroupStats, Post,
+                      TimelineEntry)
+from ..pagination import decode_cursor
 User = get_user_model()
 
 
@@ -38,7 +51,7 @@ class PostPagesTests(TestCase):
             author=cls.post.author
         )
         cls.unfollows = Follow.objects.create(
-            user=cls.user,
+            user=cls.user_2,
             author=cls.post.author
         ).delete()
         cls.author_client.force_login(cls.post.author)
@@ -170,7 +183,9 @@ class PostPagesTests(TestCase):
             response.context['page_obj'][0].text,
             self.post.text
         )
-        self.assertEqual(response.context['page_obj'][0].author, self.post.author)
+        self.assertEqual(
+            response.context['page_obj'][0].author, self.post.author
+        )
         self.assertEqual(response.context['page_obj'][0].text, self.post.text)
         response = self.authorized_client_2.get(reverse('posts:follow_index'))
         self.assertNotContains(response, self.post.text)
@@ -212,6 +227,8 @@ class PaginatorViewsTest(TestCase):
             text=f'Тестовый пост {id}',
             group=cls.group) for id in range(cls.posts_count)
         ])
+        # bulk_create идет в обход сигналов, сбрасывающих кэш лент.
+        page_cache.clear()
         cls.paginator_context_names = {
             'index': '/',
             'group_list': f'/group/{cls.group.slug}/',
@@ -231,3 +248,683 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(name=name):
                 response = self.client.get(url + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class AuthorGroupTestCase(TestCase):
+    """Автор NoName1 и тестовая группа для тестов представлений."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName1')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+
+
+@override_settings(POST_PAGINATION_MODE='cursor')
+class CursorPaginatorViewsTest(AuthorGroupTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.posts_count = 13
+        Post.objects.bulk_create([Post(
+            author=cls.user,
+            text=f'Тестовый пост {number}',
+            group=cls.group) for number in range(cls.posts_count)
+        ])
+        cls.urls = {
+            'index': '/',
+            'group_list': f'/group/{cls.group.slug}/',
+            'profile': f'/profile/{cls.user}/'
+        }
+
+    def test_cursor_pages(self):
+        """Курсорные страницы идут без пропусков и повторов."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                first = self.client.get(url).context['page_obj']
+                self.assertEqual(len(first), 10)
+                self.assertFalse(first.has_previous())
+                self.assertTrue(first.has_next())
+                second = self.client.get(
+                    url, {'after': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                seen = [post.pk for post in first] + [
+                    post.pk for post in second]
+                self.assertEqual(len(set(seen)), self.posts_count)
+                back = self.client.get(
+                    url, {'before': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.pk for post in back],
+                    [post.pk for post in first]
+                )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор отдает первую страницу."""
+        self.assertIsNone(decode_cursor('не-курсор'))
+        response = self.client.get('/', {'after': 'не-курсор'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+
+class TimelineViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def follow_feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_fan_out_on_write(self):
+        """Подписка и новый пост раскладываются по ленте читателя."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader).values_list('post_id', flat=True)),
+            {self.old_post.pk, new_post.pk}
+        )
+        self.assertEqual(self.follow_feed(), [new_post.pk, self.old_post.pk])
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.follow_feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_read_on_fan_out(self):
+        """Посты популярного автора добираются при чтении ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        call_command('update_celebrities', verbosity=0)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.follow_feed(), [new_post.pk, self.old_post.pk])
+
+    def test_rebuild_timelines_command(self):
+        """rebuild_timelines восстанавливает ленты из подписок."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', verbosity=0)
+        self.assertEqual(self.timeline(), [self.old_post.pk])
+        self.assertEqual(self.follow_feed(), [self.old_post.pk])
+
+    def timeline(self):
+        return list(TimelineEntry.objects.filter(
+            user=self.reader
+        ).order_by('-pub_date').values_list('post_id', flat=True))
+
+    def create_posts(self, count):
+        """Посты автора старше old_post, от старых к новым."""
+        posts = []
+        for number in range(count):
+            post = Post.objects.create(author=self.author, text='Пост')
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.now() - timedelta(days=1, minutes=-number)
+            )
+            posts.append(post.pk)
+        return posts
+
+    @override_settings(TIMELINE_MAX_ENTRIES=3, TIMELINE_TRIM_SLACK=1)
+    def test_timeline_is_capped(self):
+        """Подписка, новые посты и rebuild хранят только последние
+        TIMELINE_MAX_ENTRIES записей ленты."""
+        posts = self.create_posts(4)
+        Follow.objects.create(user=self.reader, author=self.author)
+        newest = [self.old_post.pk] + posts[::-1]
+        self.assertEqual(self.timeline(), newest[:3])
+        first = Post.objects.create(author=self.author, text='Первый')
+        self.assertEqual(self.timeline(), [first.pk] + newest[:3])
+        second = Post.objects.create(author=self.author, text='Второй')
+        self.assertEqual(self.timeline(), [second.pk, first.pk, newest[0]])
+        call_command('rebuild_timelines', verbosity=0)
+        self.assertEqual(self.timeline(), [second.pk, first.pk, newest[0]])
+        self.assertEqual(
+            self.follow_feed(), [second.pk, first.pk] + newest
+        )
+
+    def test_follow_feed_reads_timeline(self):
+        """Лента подписок показывает записи TimelineEntry, а не
+        пересчитывает подписки."""
+        TimelineEntry.objects.create(
+            user=self.reader, post=self.old_post,
+            pub_date=self.old_post.pub_date
+        )
+        self.assertEqual(self.follow_feed(), [self.old_post.pk])
+        response = self.reader_client.get(
+            reverse('posts:api_follow_index')
+        )
+        self.assertEqual(
+            [row['id'] for row in response.json()['results']],
+            [self.old_post.pk]
+        )
+
+    @override_settings(TIMELINE_MAX_ENTRIES=3, TIMELINE_TRIM_SLACK=1)
+    def test_posts_past_timeline_window(self):
+        """Посты старше записей ленты читаются из Post и не пропадают
+        ни со страниц, ни из курсорного API."""
+        posts = self.create_posts(4)
+        Follow.objects.create(user=self.reader, author=self.author)
+        feed = [self.old_post.pk] + posts[::-1]
+        self.assertEqual(len(self.timeline()), 3)
+        self.assertEqual(self.follow_feed(), feed)
+        with self.settings(POST_PAGE_COUNT=2):
+            response = self.reader_client.get(
+                reverse('posts:follow_index'), {'page': 3}
+            )
+            page_obj = response.context['page_obj']
+            self.assertEqual(page_obj.paginator.count, 5)
+            self.assertEqual([post.pk for post in page_obj], feed[4:])
+            api_ids, cursor = [], None
+            while cursor != '':
+                data = self.reader_client.get(
+                    reverse('posts:api_follow_index'),
+                    {'after': cursor} if cursor else {}
+                ).json()
+                api_ids += [row['id'] for row in data['results']]
+                cursor = data['next'] or ''
+            self.assertEqual(api_ids, feed)
+
+    def test_celebrity_threshold_transitions(self):
+        """Переход через порог знаменитости хранится в базе, делается
+        командой, и автор не пропадает из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        feed = [new_post.pk, self.old_post.pk]
+        with self.settings(TIMELINE_FANOUT_LIMIT=0):
+            call_command('update_celebrities', verbosity=0)
+            self.assertEqual(self.timeline(), [])
+            cache.clear()
+            self.assertEqual(self.follow_feed(), feed)
+        call_command('update_celebrities', verbosity=0)
+        self.assertEqual(self.timeline(), feed)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.follow_feed(), feed)
+        self.assertTrue(all(
+            query['sql'].startswith('SELECT') for query in queries
+        ))
+
+
+class PostCardCacheTest(AuthorGroupTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.user)
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Исходный текст',
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_card_cached_between_feeds(self):
+        """Карточка поста берется из кеша на всех лентах."""
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Исходный текст')
+
+    def test_post_edit_invalidates_card(self):
+        """Правка поста сразу видна в ленте."""
+        self.client.get(reverse('posts:index'))
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый текст', 'group': self.group.pk}
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Исходный текст')
+
+    def test_group_and_author_changes_invalidate_card(self):
+        """Правка группы и имени автора сразу видна в карточке."""
+        self.client.get(reverse('posts:index'))
+        Group.objects.filter(pk=self.group.pk).update(
+            description='Новое описание')
+        User.objects.filter(pk=self.user.pk).update(
+            first_name='Иван', last_name='Петров')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новое описание')
+        self.assertContains(response, 'Иван Петров')
+
+
+class PostDetailQueriesTest(AuthorGroupTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group
+        )
+        cls.url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk})
+
+    def add_comments(self, count):
+        for _ in range(count):
+            number = Comment.objects.count()
+            commenter = User.objects.create_user(username=f'commenter{number}')
+            Comment.objects.create(
+                post=self.post, author=commenter, text=f'Комментарий {number}')
+
+    def test_queries_do_not_depend_on_comments(self):
+        """Число запросов страницы поста не зависит от комментариев."""
+        self.add_comments(1)
+        with CaptureQueriesContext(connection) as one_comment:
+            self.authorized_client.get(self.url)
+        self.add_comments(5)
+        with CaptureQueriesContext(connection) as many_comments:
+            response = self.authorized_client.get(self.url)
+        self.assertEqual(len(one_comment), len(many_comments))
+        self.assertContains(response, 'commenter4')
+
+    @override_settings(COMMENT_PAGE_COUNT=2)
+    def test_comments_paginated_by_created(self):
+        """Комментарии разбиты на страницы в порядке создания."""
+        self.add_comments(3)
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий 0', 'Комментарий 1']
+        )
+        response = self.client.get(self.url, {'comments_page': 2})
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий 2']
+        )
+
+
+class GroupIndexViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Б группа', slug='busy', description='Много постов')
+        cls.empty_group = Group.objects.create(
+            title='А группа', slug='empty', description='Без постов')
+        for number in range(3):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group)
+        cls.latest = Post.objects.create(
+            author=cls.other, text='Последний', group=cls.group)
+        Post.objects.create(author=cls.other, text='Без группы')
+
+    def test_refresh_group_stats_command(self):
+        """refresh_group_stats считает посты, дату и авторов групп."""
+        call_command('refresh_group_stats', top_authors=1, verbosity=0)
+        stats = GroupStats.objects.get(group=self.group)
+        self.assertEqual(stats.posts_count, 4)
+        self.assertEqual(stats.latest_post, self.latest.pub_date)
+        self.assertEqual(stats.active_authors, [['author', 3]])
+        empty = GroupStats.objects.get(group=self.empty_group)
+        self.assertEqual(empty.posts_count, 0)
+        self.assertIsNone(empty.latest_post)
+        self.assertEqual(empty.active_authors, [])
+
+    def test_group_index(self):
+        """Каталог показывает группы со статистикой из сводной таблицы."""
+        call_command('refresh_group_stats', verbosity=0)
+        Post.objects.create(author=self.other, text='Новый', group=self.group)
+        response = self.client.get(reverse('posts:group_index'))
+        self.assertTemplateUsed(response, 'posts/group_index.html')
+        groups = list(response.context['groups'])
+        self.assertEqual(groups, [self.empty_group, self.group])
+        # Новый пост попадет в каталог со следующим пересчетом.
+        self.assertEqual(groups[1].stats.posts_count, 4)
+        self.assertContains(
+            response, reverse('posts:profile', args=['author']))
+
+    def test_group_index_queries_do_not_depend_on_groups(self):
+        """Число запросов каталога не зависит от числа групп и постов."""
+        call_command('refresh_group_stats', verbosity=0)
+        url = reverse('posts:group_index')
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        Group.objects.bulk_create(
+            Group(title=f'Группа {number}', slug=f'group-{number}',
+                  description='') for number in range(5)
+        )
+        call_command('refresh_group_stats', verbosity=0)
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(url)
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(len(response.context['groups']), 7)
+
+
+class QueryBudgetTest(QueryBudgetMixin, AuthorGroupTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='NoName2')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.reader)
+        for number in range(15):
+            cls.post = Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {number}',
+                group=cls.group
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.pages = {
+            'posts:index': {},
+            'posts:group_list': {'slug': cls.group.slug},
+            'posts:profile': {'username': cls.user.username},
+            'posts:post_detail': {'post_id': cls.post.pk},
+            'posts:follow_index': {},
+            'posts:group_index': {},
+        }
+
+    def test_pages_within_query_budget(self):
+        """Страницы укладываются в бюджет SQL-запросов."""
+        for url_name, kwargs in self.pages.items():
+            with self.subTest(url_name=url_name):
+                response = self.assertWithinQueryBudget(
+                    self.authorized_client, url_name, kwargs=kwargs)
+                self.assertEqual(response.status_code, 200)
+
+    def test_budget_exceeded(self):
+        """Превышение бюджета роняет проверку."""
+        with self.assertRaises(AssertionError):
+            self.assertWithinQueryBudget(
+                self.authorized_client, 'posts:index', budget=0)
+
+
+class SearchViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName1')
+        cls.best = Post.objects.create(
+            author=cls.user, text='Кошка кошка кошка')
+        cls.good = Post.objects.create(
+            author=cls.user, text='Кошка и собака гуляли долго')
+        cls.other = Post.objects.create(author=cls.user, text='Про собаку')
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_ranked_results(self):
+        """Поиск находит посты по префиксу слова в порядке ранга."""
+        self.assertEqual(
+            [post.pk for post in self.search('кошк')],
+            [self.best.pk, self.good.pk]
+        )
+        self.assertEqual(len(self.search('"*(')), 0)
+
+    def test_prefix_only_for_last_long_word(self):
+        """Префиксом ищется только последнее слово от трех букв."""
+        self.assertEqual(
+            search.match_expression('кошка и соба'), '"кошка" "и" "соба"*')
+        self.assertEqual(search.match_expression('ко'), '"ко"')
+        self.assertEqual(len(self.search('кошк и')), 0)
+        self.assertEqual(
+            [post.pk for post in self.search('и соба')], [self.good.pk])
+
+    @override_settings(SEARCH_MAX_CANDIDATES=1)
+    def test_ranked_only_latest_candidates(self):
+        """Ранжируются только самые новые совпадения."""
+        self.assertEqual(
+            [post.pk for post in self.search('кошка')], [self.good.pk])
+
+    @override_settings(POST_PAGE_COUNT=1)
+    def test_search_cursor_pagination(self):
+        """Результаты поиска листаются курсором."""
+        first = self.search('кошка')
+        self.assertEqual([post.pk for post in first], [self.best.pk])
+        second = self.search('кошка', after=first.next_cursor)
+        self.assertEqual([post.pk for post in second], [self.good.pk])
+        self.assertFalse(second.has_next())
+        back = self.search('кошка', before=second.previous_cursor)
+        self.assertEqual([post.pk for post in back], [self.best.pk])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.other.text = 'Теперь про кота'
+        self.other.save()
+        self.assertEqual(
+            [post.pk for post in self.search('кота')], [self.other.pk])
+        self.other.delete()
+        self.assertEqual(len(self.search('кота')), 0)
+
+
+class ConditionalGetTest(AuthorGroupTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='NoName2')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def revalidate(self, url, client=None):
+        client = client or self.reader_client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_page_not_rendered(self):
+        """Неизменная страница отдается как 304 без рендеринга."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertIn('ETag', response)
+                self.assertIn('no-cache', response['Cache-Control'])
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_changes_invalidate_etag(self):
+        """Новый пост, комментарий и подписка меняют ETag."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.reader_client.get(url)['ETag']
+                Comment.objects.create(
+                    post=self.post, author=self.reader, text='Комментарий')
+                Follow.objects.get_or_create(
+                    user=self.reader, author=self.user)
+                Post.objects.create(
+                    author=self.user, text='Новый пост', group=self.group)
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_feed_revalidation_reads_only_page(self):
+        """Проверка ETag ленты не считает и не сканирует все посты."""
+        url = reverse('posts:index')
+        etag = self.reader_client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('MAX(', sql)
+        self.assertNotIn('COUNT(', sql)
+
+    def test_card_changes_invalidate_feed_etag(self):
+        """Правка группы и обновление поста в обход save меняют ETag."""
+        url = reverse('posts:index')
+        for change in (
+            lambda: Group.objects.filter(pk=self.group.pk).update(
+                description='Новое описание'),
+            lambda: Post.objects.filter(pk=self.post.pk).update(
+                updated_at=timezone.now()),
+        ):
+            etag = self.reader_client.get(url)['ETag']
+            change()
+            response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Другой пользователь не получает чужую страницу из кэша."""
+        url = reverse('posts:index')
+        etag = self.reader_client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class FeedPageCacheTest(AuthorGroupTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Другое описание',
+        )
+        for number in range(3):
+            cls.post = Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, feed_key, post_list, number=1):
+        return page_cache.CachedPaginator(
+            post_list.for_feed(), 2, feed_key).get_page(number)
+
+    def test_hot_page_hydrated_by_ids(self):
+        """Повторная страница собирается по id из кэша одним запросом."""
+        first = self.get_page('index', Post.objects)
+        with self.assertNumQueries(1) as queries:
+            second = self.get_page('index', Post.objects)
+        self.assertNotIn('ORDER BY', queries.captured_queries[0]['sql'])
+        self.assertIsInstance(second, Page)
+        self.assertEqual(second.paginator.count, 3)
+        self.assertEqual(list(second), list(first))
+
+    def test_hot_feed_page_uses_cached_count(self):
+        """Горячая страница ленты не считает посты заново."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'COUNT(' in query['sql']
+        ])
+
+    def test_post_signals_invalidate_feeds(self):
+        """Создание, перенос и удаление поста сбрасывают кэш лент."""
+        group_key = page_cache.group_key(self.group.slug)
+        self.get_page('index', Post.objects)
+        self.get_page(group_key, self.group.posts)
+        post = Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group)
+        self.assertEqual(self.get_page('index', Post.objects)[0], post)
+        self.assertEqual(self.get_page(group_key, self.group.posts)[0], post)
+        post.group = self.other_group
+        post.save()
+        page = self.get_page(group_key, self.group.posts)
+        self.assertNotIn(post, page)
+        self.assertEqual(page.paginator.count, 3)
+        post.delete()
+        self.assertEqual(
+            self.get_page('index', Post.objects).paginator.count, 3)
+
+
+class StreamingViewsTest(AuthorGroupTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for number in range(3):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group)
+        Post.objects.create(author=cls.user, text='Пост без группы')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(FEED_STREAMING=True, POST_PAGE_COUNT=2)
+    def test_feed_streamed_by_cards(self):
+        """Лента отдается кусками: шапка, карточки, хвост."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.streaming)
+        self.assertTrue(response.has_header('ETag'))
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 4)
+        self.assertIn('<header>', chunks[0])
+        self.assertNotIn('Пост', chunks[0])
+        self.assertIn('Пост без группы', chunks[1])
+        self.assertIn('<hr>', chunks[1])
+        self.assertIn('Пост 2', chunks[2])
+        self.assertNotIn('<hr>', chunks[2])
+        self.assertIn('?page=2', chunks[3])
+        self.assertIn('</html>', chunks[3])
+
+    def test_group_export_csv(self):
+        """Посты группы выгружаются в CSV потоком."""
+        response = self.client.get(
+            reverse('posts:group_export', kwargs={'slug': 'test_slug'}),
+            {'format': 'csv'},
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('test_slug-posts.csv', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,text,pub_date'))
+        self.assertEqual(len(lines), 4)
+
+    def test_profile_export_jsonl(self):
+        """Посты автора выгружаются в JSONL, неизвестный формат — 404."""
+        url = reverse('posts:profile_export', kwargs={'username': 'NoName1'})
+        response = self.client.get(url)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn('"model": "post"', lines[0])
+        self.assertEqual(
+            self.client.get(url, {'format': 'xml'}).status_code, 404)
+
+    def test_export_reads_alias_chosen_in_view(self):
+        """База выгрузки выбирается в представлении, а не после
+        ReplicaRoutingMiddleware."""
+        export_rows = bulk.export_rows
+        aliases = []
+
+        def recording(model_name, queryset=None, **kwargs):
+            aliases.append(queryset._db)
+            return export_rows(model_name, queryset, **kwargs)
+
+        url = reverse('posts:profile_export', kwargs={'username': 'NoName1'})
+        with mock.patch.object(bulk, 'export_rows', recording):
+            b''.join(self.client.get(url).streaming_content)
+        self.assertEqual(aliases, ['default'])
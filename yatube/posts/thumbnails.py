@@ -0,0 +1,113 @@
+"""Фоновая нарезка миниатюр для картинок постов.
+
+После сохранения поста с новой картинкой все размеры из
+THUMBNAIL_GEOMETRIES режутся вне запроса: в пуле потоков процесса
+(THUMBNAIL_PREGENERATE = 'thread') или отдельным воркером
+`manage.py generate_thumbnails --loop` (THUMBNAIL_PREGENERATE = 'worker').
+Пока миниатюры не готовы, шаблоны показывают заглушку. Неудачная
+нарезка повторяется, а задачи, потерянные при перезапуске, пул
+подбирает при следующем планировании.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_swept = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def pending():
+    return Post.objects.filter(thumbnails_ready=False).exclude(
+        image=''
+    ).exclude(image__isnull=True)
+
+
+def generate(post_id):
+    """Режет все миниатюры поста и возвращает True, если они готовы."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return False
+    for geometry, options in settings.THUMBNAIL_GEOMETRIES:
+        get_thumbnail(post.image, geometry, **options)
+    # updated_at меняет версию кешированной карточки, и вместо
+    # заглушки появляется картинка.
+    return bool(Post.objects.filter(
+        pk=post_id, image=post.image.name
+    ).update(thumbnails_ready=True, updated_at=timezone.now()))
+
+
+def process(post_id):
+    """Обертка generate() для фоновых потоков: ошибки повторяются
+    THUMBNAIL_RETRIES раз, потом только в лог."""
+    try:
+        for attempt in range(settings.THUMBNAIL_RETRIES + 1):
+            try:
+                return generate(post_id)
+            except Exception:
+                if attempt == settings.THUMBNAIL_RETRIES:
+                    logger.exception(
+                        'Не удалось нарезать миниатюры поста %s', post_id
+                    )
+                    return False
+                logger.warning(
+                    'Повтор нарезки миниатюр поста %s', post_id,
+                    exc_info=True,
+                )
+                time.sleep(settings.THUMBNAIL_RETRY_DELAY)
+    finally:
+        close_old_connections()
+
+
+def sweep():
+    """Режет миниатюры постов, которые ждут их дольше
+    THUMBNAIL_STALE_SECONDS, и возвращает число готовых."""
+    stale = timezone.now() - timedelta(
+        seconds=settings.THUMBNAIL_STALE_SECONDS
+    )
+    try:
+        ids = list(pending().filter(
+            updated_at__lt=stale
+        ).values_list('pk', flat=True))
+    finally:
+        close_old_connections()
+    return sum(process(post_id) for post_id in ids)
+
+
+def _submit(post_id):
+    global _swept
+    now = time.monotonic()
+    try:
+        pool = executor()
+        if _swept is None or now - _swept >= settings.THUMBNAIL_SWEEP_INTERVAL:
+            _swept = now
+            pool.submit(sweep)
+        pool.submit(process, post_id)
+    except RuntimeError:
+        # Пул уже остановлен: процесс завершается.
+        process(post_id)
+
+
+def schedule(post):
+    if settings.THUMBNAIL_PREGENERATE != 'thread':
+        return
+    transaction.on_commit(lambda: _submit(post.pk))
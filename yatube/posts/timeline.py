@@ -0,0 +1,298 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Свежие посты авторов лента читает из TimelineEntry, посты
+знаменитостей и все, что старше TIMELINE_MAX_ENTRIES записей, — из Post.
+"""
+import heapq
+from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+
+User = get_user_model()
+
+# Сколько авторов rebuild() держит в памяти вместе с их постами.
+REBUILD_AUTHORS_CACHED = 1024
+
+
+def is_fanout_author(author_id):
+    return not UserCounters.objects.filter(
+        user_id=author_id, is_celebrity=True
+    ).exists()
+
+
+def latest_posts(author_id):
+    """(pub_date, pk) последних TIMELINE_MAX_ENTRIES постов автора."""
+    return list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pub_date', 'pk')[:settings.TIMELINE_MAX_ENTRIES])
+
+
+def trim(user_ids):
+    """Обрезает до TIMELINE_MAX_ENTRIES ленты, выросшие на
+    TIMELINE_TRIM_SLACK записей больше."""
+    limit = settings.TIMELINE_MAX_ENTRIES
+    overflow = limit + settings.TIMELINE_TRIM_SLACK
+    window = TimelineEntry.objects.filter(
+        user_id=OuterRef('pk')
+    ).order_by('-pub_date').values('pub_date')
+    overflowing = User.objects.filter(pk__in=user_ids).annotate(
+        overflow=Subquery(window[overflow:overflow + 1]),
+        cutoff=Subquery(window[limit - 1:limit]),
+    ).filter(overflow__isnull=False).values_list('pk', 'cutoff')
+    for user_id, cutoff in list(overflowing):
+        TimelineEntry.objects.filter(
+            user_id=user_id, pub_date__lt=cutoff
+        ).delete()
+
+
+def _fill(user_ids, posts, batch_size=None):
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for user_id in user_ids
+         for pub_date, pk in posts],
+        batch_size=batch_size or settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_ids)
+
+
+def _followers(author_id):
+    return list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True))
+
+
+def fan_out(post):
+    if not is_fanout_author(post.author_id):
+        return
+    _fill(_followers(post.author_id), [(post.pub_date, post.pk)])
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту не больше TIMELINE_MAX_ENTRIES постов автора."""
+    if not is_fanout_author(author_id):
+        return
+    _fill([user_id], latest_posts(author_id))
+
+
+def update_celebrities():
+    """Переводит авторов через порог TIMELINE_FANOUT_LIMIT и
+    возвращает их число."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    celebrities = UserCounters.objects.filter(is_celebrity=True)
+    demoted = list(celebrities.filter(
+        followers_count__lte=limit
+    ).values_list('user_id', flat=True))
+    promoted = list(UserCounters.objects.filter(
+        is_celebrity=False, followers_count__gt=limit
+    ).values_list('user_id', flat=True))
+    # Флаг меняется до записей: новые посты сразу идут нужным путем,
+    # а лента читает посты знаменитостей и из Post.
+    UserCounters.objects.filter(user_id__in=promoted).update(
+        is_celebrity=True
+    )
+    TimelineEntry.objects.filter(post__author_id__in=promoted).delete()
+    UserCounters.objects.filter(user_id__in=demoted).update(
+        is_celebrity=False
+    )
+    for author_id in demoted:
+        _fill(_followers(author_id), latest_posts(author_id))
+    return len(promoted) + len(demoted)
+
+
+def remove(user_id, author_id):
+    """Убирает посты автора из ленты, если подписки на него не осталось."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        return
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def _key_field(name, pk_field):
+    """Имя поля ключа: pk и id поста в TimelineEntry — это post_id."""
+    direction = '-' if name.startswith('-') else ''
+    field, separator, lookup = name.lstrip('-').partition('__')
+    if field in ('pk', 'id'):
+        field = pk_field
+    return direction + field + separator + lookup
+
+
+def _row_pk(row):
+    if isinstance(row, dict):
+        return row['id']
+    return row.pk
+
+
+class FollowFeed:
+    """Лента подписок: TimelineEntry и посты, которых в ней нет.
+
+    Поддерживает то, что нужно Paginator и CursorPaginator: count(),
+    срезы, filter(), exclude() и order_by() по pub_date и id.
+    """
+
+    ordered = True
+
+    def __init__(self, entries, older, posts, entries_count=None,
+                 pulls=True, descending=True):
+        self.entries = entries
+        self.older = older
+        self.posts = posts
+        self.entries_count = entries_count
+        self.pulls = pulls
+        self.descending = descending
+
+    def _clone(self, **changes):
+        options = {
+            'entries': self.entries, 'older': self.older,
+            'posts': self.posts, 'entries_count': self.entries_count,
+            'pulls': self.pulls, 'descending': self.descending,
+        }
+        options.update(changes)
+        return FollowFeed(**options)
+
+    def _keys(self, method, *fields, **lookups):
+        return [
+            getattr(keys, method)(
+                *(_key_field(field, pk_field) for field in fields),
+                **{_key_field(name, pk_field): value
+                   for name, value in lookups.items()}
+            )
+            for keys, pk_field in (
+                (self.entries, 'post_id'), (self.older, 'pk')
+            )
+        ]
+
+    def filter(self, **lookups):
+        entries, older = self._keys('filter', **lookups)
+        return self._clone(entries=entries, older=older, entries_count=None)
+
+    def exclude(self, **lookups):
+        entries, older = self._keys('exclude', **lookups)
+        return self._clone(entries=entries, older=older, entries_count=None)
+
+    def order_by(self, *fields):
+        entries, older = self._keys('order_by', *fields)
+        return self._clone(
+            entries=entries, older=older,
+            descending=fields[0].startswith('-'),
+        )
+
+    def values(self, *fields):
+        return self._clone(posts=self.posts.values(*fields))
+
+    def count(self):
+        if self.entries_count is None:
+            self.entries_count = self.entries.count()
+        return self.entries_count + self.older.count()
+
+    def _ids(self, stop):
+        entries = list(self.entries[:stop])
+        parts = [entries]
+        # Посты из Post старше любой записи ленты, кроме постов
+        # знаменитостей, поэтому первые страницы их не читают.
+        if len(entries) < stop or self.pulls or not self.descending:
+            parts.append(self.older[:stop])
+        ids, seen = [], set()
+        for _, pk in heapq.merge(*parts, reverse=self.descending):
+            # Пост знаменитости может еще лежать и в TimelineEntry.
+            if pk not in seen:
+                seen.add(pk)
+                ids.append(pk)
+                if len(ids) == stop:
+                    break
+        return ids
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        stop = self.count() if key.stop is None else key.stop
+        ids = self._ids(stop)[key.start:stop]
+        if not ids:
+            return []
+        rows = {
+            _row_pk(row): row
+            for row in self.posts.filter(pk__in=ids).order_by()
+        }
+        return [rows[pk] for pk in ids if pk in rows]
+
+
+def _window(user):
+    """Число записей ленты, самая старая из них и есть ли подписки на
+    знаменитостей — одним запросом."""
+    entries = TimelineEntry.objects.filter(user=OuterRef('pk')).order_by()
+    return User.objects.filter(pk=user.pk).annotate(
+        entries=Subquery(
+            entries.values('user').annotate(total=Count('pk'))
+            .values('total')
+        ),
+        horizon=Subquery(entries.order_by('pub_date').values('pub_date')[:1]),
+        pulls=Exists(Follow.objects.filter(
+            user=OuterRef('pk'), author__counters__is_celebrity=True
+        )),
+    ).values_list('entries', 'horizon', 'pulls').get()
+
+
+def feed_for(user, posts=None):
+    entries_count, horizon, pulls = _window(user)
+    older = Q(author__counters__is_celebrity=True)
+    if horizon is not None:
+        older |= Q(pub_date__lt=horizon)
+    else:
+        older = Q()
+    feed = FollowFeed(
+        entries=TimelineEntry.objects.filter(user=user).values_list(
+            'pub_date', 'post_id'
+        ),
+        older=Post.objects.filter(
+            older, author__following__user=user
+        ).values_list('pub_date', 'pk'),
+        posts=Post.objects.all() if posts is None else posts,
+        entries_count=entries_count or 0,
+        pulls=pulls,
+    )
+    return feed.order_by('-pub_date', '-pk')
+
+
+def rebuild(users=None, batch_size=None):
+    """Пересобирает ленты из Follow и возвращает число записей."""
+    batch_size = batch_size or settings.TIMELINE_BATCH_SIZE
+    update_celebrities()
+    entries = TimelineEntry.objects.all()
+    follows = Follow.objects.exclude(author__counters__is_celebrity=True)
+    if users is not None:
+        entries = entries.filter(user__in=users)
+        follows = follows.filter(user__in=users)
+    # Подписки читаются целиком до первой записи: пока открыт курсор
+    # чтения, SQLite не может перенести WAL в базу.
+    following = defaultdict(list)
+    for user_id, author_id in follows.values_list('user_id', 'author_id'):
+        following[user_id].append(author_id)
+    entries.delete()
+    posts_of = lru_cache(maxsize=REBUILD_AUTHORS_CACHED)(latest_posts)
+    created = 0
+    batch = []
+    for user_id, authors in following.items():
+        posts = heapq.merge(
+            *(posts_of(author_id) for author_id in authors), reverse=True
+        )
+        batch.extend(
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pub_date, pk in islice(posts, settings.TIMELINE_MAX_ENTRIES)
+        )
+        if len(batch) >= batch_size:
+            TimelineEntry.objects.bulk_create(
+                batch, batch_size=batch_size, ignore_conflicts=True
+            )
+            created += len(batch)
+            batch = []
+    TimelineEntry.objects.bulk_create(
+        batch, batch_size=batch_size, ignore_conflicts=True
+    )
+    return created + len(batch)
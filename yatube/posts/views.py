@@ -2,57 +2,238 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import OuterRef, Subquery
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.db import replica_reads
+
+from . import comment_buffer, counters, page_cache, streaming
+from .conditional import (conditional_page, feed_state, fingerprint,
+                          remember)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .models import Comment, Follow, Group, Post
+from .pagination import CursorPaginator
+from .search import SearchPaginator
+from .timeline import feed_for
 
 User = get_user_model()
 
 
-def paginator(request, post_list):
-    post = Paginator(post_list, settings.POST_PAGE_COUNT)
+def is_cursor_request(request):
+    return (
+        settings.POST_PAGINATION_MODE == 'cursor'
+        or 'after' in request.GET
+        or 'before' in request.GET
+    )
+
+
+def paginator(request, post_list, feed_key=None):
+    if is_cursor_request(request):
+        return CursorPaginator(
+            post_list, settings.POST_PAGE_COUNT
+        ).get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    if feed_key is None:
+        post = Paginator(post_list, settings.POST_PAGE_COUNT)
+    else:
+        post = page_cache.CachedPaginator(
+            post_list, settings.POST_PAGE_COUNT, feed_key
+        )
     page_number = request.GET.get('page')
     page_obj = post.get_page(page_number)
     return page_obj
 
 
+def render_feed(request, template_name, context):
+    if settings.FEED_STREAMING:
+        return streaming.stream_feed(request, template_name, context)
+    return render(request, template_name, context)
+
+
+def export_format(request):
+    name = request.GET.get('format', 'jsonl')
+    if name not in streaming.EXPORT_FORMATS:
+        raise Http404
+    return name
+
+
+def feed_page(request, post_list, feed_key=None):
+    """Страница ленты, общая для валидаторов и представления."""
+    return remember(
+        request, 'page', lambda: paginator(request, post_list, feed_key)
+    )
+
+
+def index_page(request):
+    return feed_page(
+        request, Post.objects.for_feed(), page_cache.index_key()
+    )
+
+
+def index_state(request):
+    return feed_state(request, index_page(request))
+
+
+@replica_reads
+@conditional_page(index_state)
 def index(request):
-    post_list = Post.objects.select_related('group', 'author')
     context = {
-        'page_obj': paginator(request, post_list),
+        'page_obj': index_page(request),
     }
-    return render(request, 'posts/index.html', context)
+    return render_feed(request, 'posts/index.html', context)
 
 
+@replica_reads
+def group_index(request):
+    context = {
+        'groups': Group.objects.select_related('stats').order_by('title'),
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
+def get_group(request, slug):
+    return remember(
+        request, 'group', lambda: get_object_or_404(Group, slug=slug)
+    )
+
+
+def group_page(request, group):
+    return feed_page(
+        request, group.posts.for_feed(), page_cache.group_key(group.slug)
+    )
+
+
+def group_state(request, slug):
+    group = get_group(request, slug)
+    return feed_state(
+        request, group_page(request, group), group.title, group.description,
+    )
+
+
+@replica_reads
+@conditional_page(group_state)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author')
+    group = get_group(request, slug)
     context = {
         'group': group,
-        'page_obj': paginator(request, post_list),
+        'page_obj': group_page(request, group),
     }
-    return render(request, 'posts/group_list.html', context)
+    return render_feed(request, 'posts/group_list.html', context)
+
+
+@replica_reads
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return streaming.stream_export(
+        group.posts.all(), export_format(request), f'{group.slug}-posts'
+    )
+
+
+def get_author(request, username):
+    return remember(request, 'author', lambda: get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username
+    ))
+
+
+def is_following(request, author):
+    return remember(request, 'following', lambda: (
+        request.user.is_authenticated
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    ))
+
+
+def profile_page(request, author):
+    return feed_page(
+        request, author.posts.for_feed(),
+        page_cache.profile_key(author.username)
+    )
 
 
+def profile_state(request, username):
+    author = get_author(request, username)
+    author_counters = counters.for_user(author)
+    return feed_state(
+        request, profile_page(request, author),
+        is_following(request, author),
+        author_counters.followers_count, author_counters.following_count,
+        author.get_full_name(),
+    )
+
+
+@replica_reads
+@conditional_page(profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(user=request.user, author=author)
+    author = get_author(request, username)
     context = {
         'author': author,
-        'page_obj': paginator(request, post_list),
-        'following': following
+        'page_obj': profile_page(request, author),
+        'following': is_following(request, author)
+    }
+    return render_feed(request, 'posts/profile.html', context)
+
+
+@replica_reads
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    return streaming.stream_export(
+        author.posts.all(), export_format(request),
+        f'{author.username}-posts'
+    )
+
+
+def get_post(request, post_id):
+    last_comment = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by('-created').values('created')[:1]
+    return remember(request, 'post', lambda: get_object_or_404(
+        Post.objects.select_related('author__counters', 'group').annotate(
+            last_comment=Subquery(last_comment)
+        ),
+        pk=post_id
+    ))
+
+
+def get_pending_comments(request, post_id):
+    return remember(request, 'pending_comments', lambda: (
+        comment_buffer.pending_for(post_id, request.user.pk)
+        if settings.COMMENT_BUFFERING and request.user.is_authenticated
+        else []
+    ))
+
+
+def post_state(request, post_id):
+    post = get_post(request, post_id)
+    last_modified = max(filter(None, (post.updated_at, post.last_comment)))
+    pending = get_pending_comments(request, post.pk)
+    return {
+        'etag': fingerprint(
+            request, last_modified, post.comments_count,
+            counters.for_user(post.author).posts_count,
+            [comment.created for comment in pending],
+        ),
+        'last_modified': last_modified,
     }
-    return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@conditional_page(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post(request, post_id)
     form = CommentForm(request.POST or None)
-    comments = post.comments.select_related('post')
+    comments = Paginator(
+        post.comments.select_related('author').order_by('created', 'pk'),
+        settings.COMMENT_PAGE_COUNT
+    ).get_page(request.GET.get('comments_page'))
+    pending = get_pending_comments(request, post.pk)
+    if pending and not comments.has_next():
+        # Автор сразу видит свои комментарии, еще не записанные в базу.
+        for comment in pending:
+            comment.author = request.user
+        comments.object_list = list(comments.object_list) + pending
     context = {
         'post': post,
         'form': form,
@@ -61,6 +242,23 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '')
+    page_obj = SearchPaginator(
+        query,
+        settings.POST_PAGE_COUNT,
+        Post.objects.for_feed(),
+    ).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     title = 'Добавить запись'
@@ -103,23 +301,32 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
+    if settings.COMMENT_BUFFERING:
+        if not Post.objects.filter(id=post_id).exists():
+            raise Http404
+        if form.is_valid():
+            comment_buffer.submit(
+                post_id, request.user.pk, form.cleaned_data['text']
+            )
+        return redirect('posts:post_detail', post_id=post_id)
+    post = get_object_or_404(Post, id=post_id)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
-        return redirect('posts:post_detail', post_id=post_id)
+    return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = feed_for(request.user, Post.objects.for_feed())
     context = {
         'page_obj': paginator(request, post_list),
     }
-    return render(request, 'posts/follow.html', context)
+    return render_feed(request, 'posts/follow.html', context)
 
 
 @login_required
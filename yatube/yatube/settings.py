@@ -19,6 +19,95 @@ POST_AMOUNT = 10
 
 POST_PAGE_COUNT = 10
 
+COMMENT_PAGE_COUNT = 20
+# Буферизованная запись комментариев: журнал на диске и bulk_create
+# пачкой раз в COMMENT_FLUSH_INTERVAL секунд или по COMMENT_FLUSH_SIZE
+# штук. Интервал 0 — без фонового потока, только по размеру пачки.
+COMMENT_BUFFERING = os.getenv('YATUBE_COMMENT_BUFFERING', '0') == '1'
+COMMENT_FLUSH_INTERVAL = float(
+    os.getenv('YATUBE_COMMENT_FLUSH_INTERVAL', '0.5')
+)
+COMMENT_FLUSH_SIZE = 200
+# Сколько секунд автор видит свой комментарий из буфера до записи.
+COMMENT_PENDING_TIMEOUT = 3600
+COMMENT_JOURNAL_DIR = os.getenv(
+    'YATUBE_COMMENT_JOURNAL_DIR', os.path.join(BASE_DIR, 'comment_journal')
+)
+
+# Сколько символов текста поста выбирать для карточки в ленте.
+POST_PREVIEW_LENGTH = 600
+
+# Миниатюры картинок постов режутся в фоне: 'thread' — пул потоков
+# процесса, 'worker' — `manage.py generate_thumbnails --loop`.
+THUMBNAIL_PREGENERATE = os.getenv('THUMBNAIL_PREGENERATE', 'thread')
+THUMBNAIL_WORKERS = 2
+# Повторы нарезки после ошибки и пауза перед повтором, секунды.
+THUMBNAIL_RETRIES = 2
+THUMBNAIL_RETRY_DELAY = 1.0
+# В режиме 'thread' пул раз в THUMBNAIL_SWEEP_INTERVAL секунд подбирает
+# посты, ждущие миниатюр дольше THUMBNAIL_STALE_SECONDS: их задачи
+# потерялись при перезапуске процесса.
+THUMBNAIL_SWEEP_INTERVAL = 300
+THUMBNAIL_STALE_SECONDS = 60
+THUMBNAIL_GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+# Бюджет SQL-запросов на страницу для авторизованного пользователя.
+# Проверяется тестами через core.testing.QueryBudgetMixin и фикстуру
+# query_budget; превышение роняет тесты.
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    # Окно ленты, число постов за окном, ключи страницы из
+    # TimelineEntry и посты по id.
+    'posts:follow_index': 6,
+    'posts:group_index': 3,
+}
+
+# 'page' — нумерованные страницы, 'cursor' — keyset-пагинация по
+# (pub_date, id) без COUNT(*) и OFFSET. Параметры ?after=/?before=
+# включают курсорный режим и при 'page'.
+POST_PAGINATION_MODE = os.getenv('POST_PAGINATION_MODE', 'page')
+# Потоковый рендеринг лент: карточки и миниатюры рендерятся по мере
+# отправки, посты страницы читаются до ответа.
+FEED_STREAMING = os.getenv('YATUBE_FEED_STREAMING', '0') == '1'
+# Сколько секунд хранить в кэше id постов страниц лент и их число.
+FEED_PAGE_CACHE_TIMEOUT = 300
+
+# Лента подписок: посты авторов, у которых подписчиков больше лимита,
+# не раскладываются по лентам, а добираются при чтении. Переход через
+# лимит отмечает команда update_celebrities.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+# Сколько последних постов хранится в ленте читателя. Лента
+# обрезается, когда в ней набирается на TIMELINE_TRIM_SLACK записей
+# больше, чтобы не проверять длину на каждую вставку.
+TIMELINE_MAX_ENTRIES = 200
+TIMELINE_TRIM_SLACK = 20
+
+# Сколько самых активных авторов группы показывать в каталоге групп.
+GROUP_STATS_TOP_AUTHORS = 3
+
+# Поиск ранжирует по bm25 только столько самых новых совпадений.
+SEARCH_MAX_CANDIDATES = 1000
+
+# Сколько запросов ASGI-приложение одновременно выполняет в Django.
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', '16'))
+
+# Сколько секунд клиенты и прокси могут кэшировать ответы JSON API.
+API_CACHE_MAX_AGE = 30
+
+# Доля профилируемых запросов (0 — выключено) и режим: 'cprofile' —
+# дамп cProfile и тайминги, 'timings' — только SQL и шаблоны.
+PROFILING_SAMPLE_RATE = float(os.getenv('YATUBE_PROFILE_RATE', '0'))
+PROFILING_MODE = os.getenv('YATUBE_PROFILE_MODE', 'cprofile')
+PROFILING_DIR = os.getenv(
+    'YATUBE_PROFILE_DIR', os.path.join(BASE_DIR, 'profiles')
+)
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -27,7 +116,7 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 SECRET_KEY = '+ww56@qk(%u^td_wa%u_xp(28bia8u+gmg1in+hn806rg7a+$w'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('YATUBE_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -54,11 +143,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -91,10 +182,40 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.getenv(
+            'YATUBE_DB', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_CONN_MAX_AGE', '60')),
     }
 }
 
+# Прагмы, которые core.sqlite выполняет на каждом новом соединении с
+# SQLite; YATUBE_SQLITE_TUNING=0 оставляет настройки SQLite по умолчанию.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+} if os.getenv('YATUBE_SQLITE_TUNING', '1') == '1' else {}
+
+# Реплики для чтения: YATUBE_REPLICAS — список файлов SQLite через
+# запятую. Локально их наполняет `manage.py sync_replicas`, в тестах
+# они зеркалируют default.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+        filter(None, os.getenv('YATUBE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, name.strip()),
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+# Сколько секунд после POST клиент читает из основной базы.
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -114,11 +235,46 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
-} 
+# Кеш выбирается переменной окружения YATUBE_CACHE:
+# locmem — память процесса (по умолчанию, у каждого воркера своя копия),
+# file — файловый кеш, sqlite — общий кеш в файле SQLite,
+# tiered — LRU в памяти процесса перед общим SQLite-кешем.
+CACHE_DIR = os.getenv('YATUBE_CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+SHARED_CACHE = {
+    'BACKEND': 'core.cache.SQLiteCache',
+    'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+    'OPTIONS': {
+        'MAX_ENTRIES': 100000,
+    },
+}
+CACHE_PRESETS = {
+    'locmem': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    },
+    'file': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'files'),
+        },
+    },
+    'sqlite': {
+        'default': SHARED_CACHE,
+    },
+    'tiered': {
+        'default': {
+            'BACKEND': 'core.cache.TieredCache',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 5,
+            },
+        },
+        'shared': SHARED_CACHE,
+    },
+}
+CACHES = CACHE_PRESETS[os.getenv('YATUBE_CACHE', 'locmem')]
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
@@ -139,6 +295,14 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.getenv(
+    'YATUBE_STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles')
+)
+# Хэши в именах, .gz/.br копии и вечный кэш для собранной статики.
+# Без DEBUG нужен collectstatic; в разработке статику отдает runserver.
+if os.getenv('YATUBE_STATIC_MANIFEST', '0' if DEBUG else '1') == '1':
+    STATICFILES_STORAGE = 'core.static.CompressedManifestStaticFilesStorage'
+STATIC_SERVE = os.getenv('YATUBE_STATIC_SERVE', '0' if DEBUG else '1') == '1'
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 #  подключаем движок filebased.EmailBackend